@@ -4,12 +4,12 @@ from enum import Enum
 from dataclasses import dataclass, field
 
 import CONFIG
-from Enums import CommField
+from CommRecord import CommRecord, LAYOUT_FACTORY, LAYOUT_BIDDING
 from DataPoint import DataPoint, Request, Mayfly
 
 
 # internal agent used in service to shadow an agent
-@dataclass
+@dataclass(slots=True)
 class Drone(DataPoint):
     request_id: str = ""
     source_id: str = ""
@@ -18,11 +18,14 @@ class Drone(DataPoint):
     data_id: str = ""
 
     # data_response that the role is trying to find
-    data_to_find: dict = field(default_factory=dict)
+    data_to_find: CommRecord = field(default_factory=CommRecord)
 
     # data_response that the agent should return with
     data_response: DataPoint = None
 
+    # time-slot the data is needed for, carried from the request to the response
+    deadline: int = None
+
     # method to get data_response when agent returns
     def get_data(self):
         return self.data_response
@@ -31,15 +34,28 @@ class Drone(DataPoint):
         """mirror agent data to start service internal usage"""
         self.request_id = agent.request_id
         self.source_id = agent.source_id
-        self.data_to_find = agent.data_to_find
+        # copy values, the agent is reset in place when its transaction terminates
+        self.data_to_find.copy_from(agent.data_to_find)
         self.data_from_drone(agent=agent)
 
     def data_from_drone(self, agent: Drone):
         """set agent data for dispatch, without changing communication parameters"""
         self.priority = agent.priority
+        self.deadline = agent.deadline
         self.data_id = agent.data_id
         self.data_response = agent.data_response
 
+    # function to reset drone in place for reuse, the layout of data_to_find is kept and its values emptied
+    def reset_assignment(self):
+        self.my_id = ""
+        self.priority = CONFIG.PRIORITY_DEFAULT
+        self.deadline = None
+        self.request_id = ""
+        self.source_id = ""
+        self.data_id = ""
+        self.data_to_find.reset()
+        self.data_response = None
+
     def __lt__(self, agent: Agent):
         return self.priority < agent.priority
 
@@ -67,9 +83,9 @@ class AgentRole(Enum):
     IDLE = "IDLE"
 
 
-@dataclass
+@dataclass(slots=True)
 class Agent(Drone):
-    platform = None
+    platform: object = field(default=None, repr=False)
     my_id: str = CONFIG.NAME_AGENT + str(0).zfill(CONFIG.NAME_ZERO_FILL)
     transaction_id: str = ""
 
@@ -89,33 +105,32 @@ class Agent(Drone):
     def set_role(self, role: AgentRole):
         # set role
         self.role = role
-        # configure data_to_find according to role
+        # configure data_to_find according to role, kept if the role is the same as in the last transaction
         if role is AgentRole.FACTORY:
-            self.data_to_find = dict.fromkeys(CommField.factory())
+            self.data_to_find.set_layout(LAYOUT_FACTORY)
         if role is AgentRole.BIDDING:
-            self.data_to_find = dict.fromkeys(CommField.bidding())
+            self.data_to_find.set_layout(LAYOUT_BIDDING)
 
     # method to fill data_response-fields that need to found
     def request_data_to_find(self, mayfly: Mayfly):
-        for comm_field in self.data_to_find:
-            self.data_to_find[comm_field] = mayfly.get_data(comm_field)
+        self.data_to_find.fill_from(mayfly.data)
 
     def terminate(self):
         self.platform.agents_handler.terminate_transaction(agent=self)
 
     def prepare_from_request(self, request: Request):
         self.priority = request.priority
+        self.deadline = request.deadline
         self.request_id = request.request_id
         self.source_id = request.source_id
         self.destination_id = request.destination_id
         self.data_id = request.data_id
 
-    # function to reset agent
+    # function to reset agent in place at the end of a transaction, the agent keeps its id and role
     def reset_assignment(self):
+        my_id = self.my_id
+        Drone.reset_assignment(self)
+        self.my_id = my_id
         # reset transaction_id
         self.transaction_id = ""
-        self.my_id = ""
-        self.data_id = ""
-
-        # remove contained data_response
-        self.data = None
+        self.destination_id = ""
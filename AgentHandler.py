@@ -1,5 +1,4 @@
 from __future__ import annotations
-from pubsub import pub
 from loguru import logger
 
 # Machine sub-module classes
@@ -34,30 +33,38 @@ class AgentHandler:
 
     # function to data_response an agent
     def request_factory_agent(self, request_data: Mayfly):
-        # create a shadow data_response for tracking
-        request = Request(request_id=request_data.request_id, source_id=self.employer.my_id,
-                          destination_id=self.platform.ece.my_id, data_id=request_data.data_id)
-        self.requests_table.insert(datapoint=request_data)
-
-        # log data_response
-        logger.info(self.my_id + ' ' + f'factory agent request {request_data.request_id}')
-
-        # data_response an agent from FCC and get a response
-        # self.fcc.request_agent(agent=request)
-        pub.sendMessage(topicName=CONFIG.TOPIC_FCC, request=request)
+        self.request_factory_agents(requests_data=[request_data])
 
     def request_bidding_agent(self, request_data: Mayfly):
-        # create a shadow data_response for tracking
-        request = Request(request_id=request_data.request_id, source_id=self.employer.my_id,
-                          destination_id=self.platform.market.my_id, data_id=request_data.data_id)
-        self.requests_table.insert(datapoint=request_data)
+        self.request_bidding_agents(requests_data=[request_data])
 
+    # function to data_response agents for a batch of mayflys with a single message to the FCC
+    def request_factory_agents(self, requests_data: [Mayfly]):
+        if not requests_data:
+            return
+        requests = self.create_requests(requests_data=requests_data, destination_id=self.platform.ece.my_id)
         # log data_response
-        logger.info(self.my_id + ' ' + f'factory agent request {request_data.request_id}')
-
-        # data_response an agent from FCC and get a response
-        # self.bcc.request_agent(agent=request)
-        pub.sendMessage(topicName=CONFIG.TOPIC_BCC, request=request)
+        logger.info(self.my_id + ' ' + f'{len(requests)} factory agents requested')
+        self.platform.bus.sendMessage(topicName=CONFIG.TOPIC_FCC, requests=requests)
+
+    # function to data_response agents for a batch of mayflys with a single message to the BCC
+    def request_bidding_agents(self, requests_data: [Mayfly]):
+        if not requests_data:
+            return
+        requests = self.create_requests(requests_data=requests_data, destination_id=self.platform.market.my_id)
+        # log data_response
+        logger.info(self.my_id + ' ' + f'{len(requests)} bidding agents requested')
+        self.platform.bus.sendMessage(topicName=CONFIG.TOPIC_BCC, requests=requests)
+
+    # create a shadow data_response per mayfly for tracking
+    def create_requests(self, requests_data: [Mayfly], destination_id: str) -> [Request]:
+        requests = []
+        for request_data in requests_data:
+            requests.append(Request(request_id=request_data.request_id, source_id=self.employer.my_id,
+                                    destination_id=destination_id, data_id=request_data.data_id,
+                                    priority=request_data.priority, deadline=request_data.get_deadline()))
+            self.requests_table.insert(datapoint=request_data)
+        return requests
 
     # functions to handle agents received
 
@@ -102,8 +109,8 @@ class AgentHandler:
         self.fcc = machine.platform.fcc
         self.bcc = machine.platform.bcc
         self.platform = machine.platform
+        # agents are routed to receive_agent by the platform, registered with the employer
         self.topic = self.topic + CONFIG.TOPIC_SEPARATOR + self.my_id
-        pub.subscribe(self.receive_agent, topicName=self.topic)
 
     # method to return entity_id
     @property
@@ -1,12 +1,14 @@
+import time
 from abc import abstractmethod
+from math import inf
 
 from loguru import logger
-from pubsub import pub
 
 # Communication Controller Class inherits from Communication controller class
 import CONFIG
 from Agent import Agent, AgentRole
 from DataPoint import Request, DataPoint
+from LatencyStats import LatencyStats
 from PlatformQueue import PlatformQueue
 from PlatfromHashTable import PlatformHashTable
 
@@ -20,12 +22,22 @@ class CC:
         self.agents_handler = None
         self.topic = topic
 
-        # Create hash tables and Queues
+        # Create hash tables and Queues, requests are ordered by deadline and then priority
         # save unfulfilled agent requests by employer
-        self.machine_requests_queue = PlatformQueue()
+        self.machine_requests_queue = PlatformQueue(max_size=platform.config.queue_max_size or None,
+                                                    key=self.request_key)
 
         # save unfulfilled agent requests by service
-        self.service_requests_queue = PlatformQueue()
+        self.service_requests_queue = PlatformQueue(max_size=platform.config.queue_max_size or None,
+                                                    key=self.request_key)
+
+        # seconds from request to grant, by priority
+        self.grant_latencies: {int: LatencyStats} = {}
+        # requests granted after the round of their time-slot stopped accepting bids
+        self.num_grants_late = 0
+        # drains stopped because no agent was free, and requests left waiting by them
+        self.num_stalls = 0
+        self.num_requests_stalled = 0
 
         # table to track agents deployed
         self.shadow_agents_table = PlatformHashTable()
@@ -33,63 +45,96 @@ class CC:
         # event loop for running internal coroutines
         # self.loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
         # topics to subscribe to
-        pub.subscribe(self.on_new_agent_requested, CONFIG.TOPIC_CC_CHECK_REQUESTS_QUEUE)
+        # a drain is posted once however many requests or freed agents arrive before it runs
+        self.is_drain_scheduled = False
+        self.num_drains = 0
+        self.platform.bus.subscribe(self.schedule_drain, CONFIG.TOPIC_CC_CHECK_REQUESTS_QUEUE)
 
     # monitor resources and requests before assigning agents
 
     # function to listen to data_response addition events
+    # requests are granted earliest deadline first over both queues, service requests first on equal keys.
+    # A request leaves its queue only once an agent is reserved for it, the drain stops at the first request
+    # without a free agent and the waiting requests keep their place
     def on_new_agent_requested(self):
-        # check on service requests first due to higher priority
-
-        # TODO: (Real-time Scheduling) manage granting of agents to either machine or ECE
-        while not self.service_requests_queue.is_empty():
-            request = self.service_requests_queue.get()
-            # if no agent is granted then there is not enough agents
-            if not self.grant_request(request=request):
-                # leave the loop
+        while True:
+            queue = self.next_requests_queue()
+            if queue is None:
                 break
-
-        while not self.machine_requests_queue.is_empty():
-            # retrieve data_response from requests queue
-            request = self.machine_requests_queue.get()
-            # if no agent is granted then there is not enough agents
-            if not self.grant_request(request=request):
+            request = queue.peek()
+            agent = self.reserve_agent(request=request)
+            # if no agent is reserved then there is not enough agents
+            if agent is None:
+                self.num_stalls += 1
+                num_requests = self.service_requests_queue.size() + self.machine_requests_queue.size()
+                self.num_requests_stalled += num_requests
+                logger.info(self.my_id + ' ' + f'no agent free, {num_requests} requests wait')
                 # leave the loop
                 break
+            # retrieve data_response from requests queue
+            queue.get()
+            self.grant_request(request=request, agent=agent)
+
+    # queue holding the request with the earliest deadline, None if no request waits
+    def next_requests_queue(self):
+        queue_next = None
+        key_next = None
+        for queue in (self.service_requests_queue, self.machine_requests_queue):
+            if not queue.is_empty():
+                key = self.request_key(queue.peek())
+                if key_next is None or key < key_next:
+                    queue_next, key_next = queue, key
+        return queue_next
+
+    # sort key of a request: deadline, requests without deadline last, then priority
+    @staticmethod
+    def request_key(request: Request):
+        return (request.deadline if request.deadline is not None else inf), request.priority
 
     # functions for CC-to-any communications
 
     # function called by employer to data_response an agent
     def request_agent(self, request: Request):
-        if request.source_id is self.service.my_id:
-            self.service_requests_queue.put(item=request)
-        else:
-            # put data_response in queue
-            self.machine_requests_queue.put(item=request)
+        self.request_agents(requests=[request])
+
+    # function called by employer or service to data_response agents for a batch of requests
+    def request_agents(self, requests: [Request]):
+        if not requests:
+            return
+        time_requested = time.perf_counter()
+        for request in requests:
+            request.time_requested = time_requested
+        # put data_response in queue of its source
+        self.service_requests_queue.put_many([request for request in requests
+                                              if request.source_id is self.service.my_id])
+        self.machine_requests_queue.put_many([request for request in requests
+                                              if request.source_id is not self.service.my_id])
 
         # log data_response
-        logger.info(self.my_id + ' ' + f'agent requested by {request.source_id}')
+        logger.info(self.my_id + ' ' + f'{len(requests)} agents requested by {requests[0].source_id}')
 
         # call CC events listener
+        self.schedule_drain()
+
+    # post a drain of the requests queues unless one is pending already
+    def schedule_drain(self):
+        if not self.is_drain_scheduled:
+            self.is_drain_scheduled = True
+            self.platform.bus.post(self.drain)
+
+    def drain(self):
+        self.is_drain_scheduled = False
+        self.num_drains += 1
         self.on_new_agent_requested()
 
-    # function for granting requests
-    def grant_request(self, request: Request):
-        agent = self.reserve_agent(request=request)
-        # check if agent is granted
-        if agent is not None:
-            # prepare and grant agent
-            agent.prepare_from_request(request=request)
-            self.set_agent_role(agent=agent)
-            logger.info(self.my_id + ' ' + f'agent request {request.request_id} granted to {request.source_id}')
-            agent.to_source()
-            dispatch_status = True
-        else:
-            logger.info(self.my_id + ' ' + f'agent request {request.request_id} failed, returned to queue')
-            # return data_response to queue
-            self.service_requests_queue.put(request)
-            dispatch_status = False
-        return dispatch_status
+    # function for granting a request with a reserved agent
+    def grant_request(self, request: Request, agent: Agent):
+        # prepare and grant agent
+        agent.prepare_from_request(request=request)
+        self.set_agent_role(agent=agent)
+        logger.info(self.my_id + ' ' + f'agent request {request.request_id} granted to {request.source_id}')
+        self.record_grant(request=request)
+        agent.to_source()
 
     # reserve agent to grant a data_response
     def reserve_agent(self, request: Request):
@@ -101,10 +146,39 @@ class CC:
 
         # attempt to reserve agent
         agent = self.agents_handler.reserve_agent()
-        agent.transaction_id = transaction_id
+        if agent is not None:
+            agent.transaction_id = transaction_id
 
         return agent
 
+    # method to record latency of a granted request
+    def record_grant(self, request: Request):
+        latencies = self.grant_latencies.get(request.priority)
+        if latencies is None:
+            latencies = self.grant_latencies[request.priority] = \
+                LatencyStats(max_samples=self.platform.config.latency_samples)
+        latencies.add(time.perf_counter() - request.time_requested)
+        if self.is_grant_late(request=request):
+            self.num_grants_late += 1
+
+    # method to check if a request is granted too late for its time-slot (dependent on CC module)
+    def is_grant_late(self, request: Request) -> bool:
+        return False
+
+    # grant latency percentiles in seconds by priority, over the recent grants
+    def grant_latency_percentiles(self, percentiles=(50, 90, 99)) -> dict:
+        return {priority: latencies.percentiles(percentiles)
+                for priority, latencies in sorted(self.grant_latencies.items())}
+
+    def log_grant_latencies(self):
+        for priority, values in self.grant_latency_percentiles().items():
+            latencies = self.grant_latencies[priority]
+            logger.info(self.my_id + ' ' + f'priority {priority}: {latencies.count} grants, '
+                        f'max {latencies.max * 1000:.2f}ms, '
+                        + ', '.join(f'p{percentile} {value * 1000:.2f}ms' for percentile, value in values.items()))
+        logger.info(self.my_id + ' ' + f'{self.num_grants_late} grants after the round of their time-slot')
+        logger.info(self.my_id + ' ' + f'{self.num_stalls} stalls, {self.num_requests_stalled} requests stalled')
+
     # method to set agent role (dependent on CC module)
     @abstractmethod
     def set_agent_role(self, agent: Agent):
@@ -136,7 +210,7 @@ class FCC(CC):
     def register_in_platform(self):
         CC.register_in_platform(self)
         self.service = self.platform.ece
-        pub.subscribe(self.request_agent, topicName=self.topic)
+        self.platform.bus.subscribe(self.request_agents, topicName=self.topic)
 
 
 class BCC(CC):
@@ -146,8 +220,13 @@ class BCC(CC):
     def set_agent_role(self, agent: Agent):
         agent.set_role(AgentRole.BIDDING)
 
+    # bid of a machine granted after the round of its time-slot was released
+    def is_grant_late(self, request: Request) -> bool:
+        return request.source_id is not self.service.my_id and request.deadline is not None and \
+            request.deadline <= self.platform.time_running and not self.platform.barrier.is_open_for(request.deadline)
+
     # method to register relevant entities
     def register_in_platform(self):
         CC.register_in_platform(self)
         self.service = self.platform.market
-        pub.subscribe(self.request_agent, topicName=self.topic)
+        self.platform.bus.subscribe(self.request_agents, topicName=self.topic)
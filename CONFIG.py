@@ -2,46 +2,170 @@
 # imports
 from __future__ import annotations
 
+import argparse
+import os
 from datetime import datetime
-from inputimeout import TimeoutOccurred
+from functools import cached_property
 from configparser import ConfigParser
 import numpy as np
 
 from CONFIG_PROFILES import ConfigProfile, SimParam
+from TimeGrid import TimeGrid
 from Enums import JobRecField, JobConstraint, JobStatus, ObjectiveJob, ObjectiveGeneral, ObjectiveEval, EcoInfo
 
-# Read simulation parameters from a config.ini
-config_sim = ConfigParser()
-config_sim.read('CONFIG_PROFILES.ini')
+# Simulation parameters are read from CONFIG_PROFILES.ini next to this file
+PATH_PROFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'CONFIG_PROFILES.ini')
+# environment variables used to resolve a simulation configuration without prompting
+ENV_PREFIX = "PG_"
+ENV_PROFILE = ENV_PREFIX + "PROFILE"
+# default directory of the persistent price cache
+PATH_PRICE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'prices')
 
-# take input about chosen test profile
-try:
-    # test_profile = inputimeout(prompt=f'Choose test profile({list(ConfigProfile.__dict__.values())[1:4]}): ', timeout=5)
-    test_profile = input(f'Choose test profile({list(ConfigProfile.__dict__.values())[1:4]}): ')
-    sim_profile = config_sim[test_profile]
-except (TimeoutOccurred, KeyError):
-    test_profile = ConfigProfile.TEST
-    sim_profile = config_sim[test_profile]
+# run options of a simulation that are not part of a profile: name -> (type, default, help)
+# set as --name-of-option argument or PG_NAME_OF_OPTION environment variable
+DICT_SIM_OPTIONS = {
+    'offline': (bool, False, "serve prices only from the price cache and fixtures, never from the network"),
+    'price_cache': (str, PATH_PRICE_CACHE, "directory of the persistent price cache"),
+    'price_fixtures': (str, None, "directory of price fixtures (same layout as the price cache)"),
+    'time_release_max': (int, 50, "latest release time of generated jobs, in time-slots after the reference time"),
+    'time_deadline_max': (int, 100, "longest time from release to due time of generated jobs, in time-slots"),
+    'priority_levels': (int, 3, "number of job priority levels including zero, the lower the value the higher the "
+                                "priority"),
+    'price_source': (str, 'smard', "source of the ECE prices: smard, file or synthetic"),
+    'price_file': (str, None, "CSV or Parquet file with columns timestamp and price, used by the file source"),
+    'price_seed': (int, 0, "seed of the synthetic price source"),
+    'smard_url': (str, "https://www.smard.de/app/chart_data", "base url of the smard.de chart data"),
+    'smard_timeout': (float, 30.0, "seconds to wait for smard.de to connect or send data before the fetch fails"),
+    'prefetch_workers': (int, 4, "maximum number of week blocks the ECE fetches concurrently"),
+    'prefetch_adjacent': (bool, True, "let the ECE prefetch the week after a requested horizon"),
+    'price_memory_bytes': (int, 64 * 2 ** 20, "byte budget of the week blocks the ECE keeps in memory"),
+    'price_revalidate': (float, 3600.0, "seconds after which week blocks of weeks not over yet are fetched again"),
+    'observe_agents': (bool, False, "also publish every agent move on the platform bus for observers"),
+    'round_deadline': (float, 0.0, "seconds a bidding round waits for late bids before clearing, 0 waits for all"),
+    'agents_elastic': (bool, True, "start with the minimum number of agents and add agents when requests queue up"),
+    'agents_grow_depth': (int, 2, "number of queued agent requests that makes the agent pool grow"),
+    'agents_grow_wait': (float, 0.05, "seconds requests wait for an agent before the agent pool grows"),
+    'agents_shrink_wait': (float, 1.0, "seconds after the agent pool grew before it retires idle agents again"),
+    'latency_samples': (int, 1000, "number of recent grant latencies the CCs keep for percentiles"),
+    'queue_max_size': (int, 0, "maximum number of items in a request or service queue, 0 is unbounded"),
+    'pipeline_rounds': (bool, False, "collect the bids of the next round while the current round is cleared"),
+    'shards': (int, 0, "number of worker processes the machines are split across, 0 runs them in this process"),
+}
+
+
+# function to convert an option value given as string to its type
+def parse_option(value, option_type: type, default):
+    if value is None:
+        return default
+    if option_type is bool and isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return option_type(value)
+
+
+# class holding the parameters of a single simulation
+# resolved (highest precedence first) from command-line arguments, PG_* environment variables and the .ini profile,
+# so that several simulations with different parameters can run side by side in one process
+class SimConfig:
+    def __init__(self, profile: str = ConfigProfile.TEST, path: str = PATH_PROFILES, options: dict = None,
+                 **overrides):
+        # read profile from .ini file, fall back to the TEST profile when the profile is not found
+        config_sim = ConfigParser()
+        config_sim.read(path)
+        if profile not in config_sim:
+            profile = ConfigProfile.TEST
+        sim_profile = dict(config_sim[profile])
+        # apply overrides of single parameters
+        sim_profile.update({param.lower(): value for param, value in overrides.items() if value is not None})
+
+        self.profile = profile
+        self.n_machines = int(sim_profile[SimParam.NUM_MACHINES.lower()])
+        self.n_jobs = int(sim_profile[SimParam.NUM_JOBS.lower()])
+        self.ref_datetime = str(sim_profile[SimParam.TIME_REF.lower()])
+        self.n_agents = int(sim_profile[SimParam.NUM_AGENTS.lower()])  # Maximum number of agents created per Platform
+
+        # run options, see DICT_SIM_OPTIONS
+        options = {} if options is None else options
+        for name, (option_type, default, _) in DICT_SIM_OPTIONS.items():
+            setattr(self, name, parse_option(options.get(name), option_type, default))
+
+    @property
+    def n_suppliers(self) -> int:
+        return self.n_machines
+
+    @property
+    def n_agents_min(self) -> int:
+        return 1 if int(self.n_agents * FACTOR_AGENTS_MIN) <= 0 else int(self.n_agents * FACTOR_AGENTS_MIN)
+
+    @property
+    def n_initial_capacity(self) -> int:
+        return self.n_jobs * 20
+
+    @property
+    def name_zero_fill(self) -> int:
+        return int(np.log10(self.n_jobs)) + 3 if self.n_jobs >= self.n_machines else int(np.log10(self.n_machines)) + 3
+
+    @property
+    def ref_timestamp(self) -> int:
+        return int(datetime.strptime(self.ref_datetime, TIME_KEY_FORMAT).timestamp())
+
+    # grid mapping timestamps to slot indexes relative to the reference time, built once per configuration
+    @cached_property
+    def time_grid(self) -> TimeGrid:
+        return TimeGrid(ref_timestamp=self.ref_timestamp, interval=TIME_INTERVAL_UNIX)
+
+    # create configuration from PG_* environment variables, e.g. PG_PROFILE=LONG, PG_NUM_JOBS=100
+    @classmethod
+    def from_env(cls, environ=None, path: str = PATH_PROFILES) -> SimConfig:
+        environ = os.environ if environ is None else environ
+        overrides = {param: environ.get(ENV_PREFIX + param) for param in SimParam.all()}
+        options = {name: environ.get(ENV_PREFIX + name.upper()) for name in DICT_SIM_OPTIONS}
+        return cls(profile=environ.get(ENV_PROFILE, ConfigProfile.TEST), path=path, options=options, **overrides)
+
+    # create configuration from command-line arguments, unspecified arguments fall back to the environment
+    @classmethod
+    def from_args(cls, argv=None, environ=None, path: str = PATH_PROFILES) -> SimConfig:
+        environ = os.environ if environ is None else environ
+        parser = argparse.ArgumentParser(description="Energy market trading platform simulation")
+        parser.add_argument('--profile', default=environ.get(ENV_PROFILE, ConfigProfile.TEST),
+                            help=f"test profile {ConfigProfile.all()}")
+        for param in SimParam.all():
+            parser.add_argument('--' + param.lower().replace('_', '-'), dest=param,
+                                default=environ.get(ENV_PREFIX + param))
+        for name, (option_type, _, option_help) in DICT_SIM_OPTIONS.items():
+            # boolean options can be given as a flag without value
+            parser.add_argument('--' + name.replace('_', '-'), dest=name,
+                                default=environ.get(ENV_PREFIX + name.upper()),
+                                nargs='?' if option_type is bool else None, const='1' if option_type is bool else None,
+                                help=option_help)
+        args = parser.parse_args(argv)
+        overrides = {param: getattr(args, param) for param in SimParam.all()}
+        options = {name: getattr(args, name) for name in DICT_SIM_OPTIONS}
+        return cls(profile=args.profile, path=path, options=options, **overrides)
+
+    def __str__(self):
+        return f"profile: {self.profile}, machines: {self.n_machines}, jobs: {self.n_jobs}, " \
+               f"agents: {self.n_agents}, reference time: {self.ref_datetime}"
 
-print(f'Running profile: {test_profile}')
 
 # Simulation Parameters
-N_MACHINES = int(sim_profile[SimParam.NUM_MACHINES])
-N_JOBS = int(sim_profile[SimParam.NUM_JOBS])
-REF_DATETIME = str(sim_profile[SimParam.TIME_REF])
-N_AGENTS = int(sim_profile[SimParam.NUM_AGENTS])  # Maximum number of agents created per Platform
-N_SUPPLIERS = N_MACHINES
+# default configuration of the process, resolved without prompting (see SimConfig)
+DEFAULT_CONFIG = SimConfig.from_env()
+N_MACHINES = DEFAULT_CONFIG.n_machines
+N_JOBS = DEFAULT_CONFIG.n_jobs
+REF_DATETIME = DEFAULT_CONFIG.ref_datetime
+N_AGENTS = DEFAULT_CONFIG.n_agents  # Maximum number of agents created per Platform
+N_SUPPLIERS = DEFAULT_CONFIG.n_suppliers
 WEIGHT_OBJECTIVE_SPECIFIED = 10  # emphasis weight for specified objectives vs unspecified ones
 DEFAULT_BIDDING_MARKUP = 1  # in %
 N_BIDS_DEFAULT = 1  # number of bids that can be submitted by a employer for a single time-slot
 FACTOR_AGENTS_MIN = 0.1  # fraction of agents that are deployed before a market round is triggered
-N_AGENTS_MIN = 1 if int(N_AGENTS * FACTOR_AGENTS_MIN) <= 0 else int(N_AGENTS * FACTOR_AGENTS_MIN)
+N_AGENTS_MIN = DEFAULT_CONFIG.n_agents_min
 DEFAULT_ECO_INFO = EcoInfo.WHOLESALE
-N_INITIAL_CAPACITY = N_JOBS * 20  # Initial number of buckets in all the HashTables and Queues
+N_INITIAL_CAPACITY = DEFAULT_CONFIG.n_initial_capacity  # Initial number of buckets in all the HashTables
 
 # Priority
 # number of priority levels including zero. The lower priority value, the higher the priority.
-PRIORITY_LEVELS = 3
+PRIORITY_LEVELS = DEFAULT_CONFIG.priority_levels
 # Default priority level
 PRIORITY_DEFAULT = PRIORITY_LEVELS - 1  # Default priority is the lowest priority
 PRIORITY_WEIGHT_NOMINAL = 1  # additional weight factored over the profile-calculated weight (see PriorityProfile)
@@ -59,6 +183,7 @@ ID_BCC = "BCC"
 ID_MARKET = "BiddingModule"  # name of bidding module
 ID_PLATFORM = "Platform"
 ID_EXTERNAL_MARKET = "ExternalMarket"  # Energy suppliers module name
+ID_COORDINATOR = "Coordinator"  # coordinator of the sharded platform
 
 # Naming conventions
 NAME_REQUEST_ESTIMATION = "RE"
@@ -74,16 +199,17 @@ NAME_BID_JOB = "BJ"
 NAME_PLATFORM_ENTITY = "PE"
 NAME_STRATEGY_EVALUATION = "SE"
 NAME_STRATEGY_BIDDING = "SB"
-NAME_ZERO_FILL = int(np.log10(N_JOBS)) + 3 if N_JOBS >= N_MACHINES else int(np.log10(N_MACHINES)) + 3
+NAME_ZERO_FILL = DEFAULT_CONFIG.name_zero_fill
 
 # Time Parameters
 TIME_KEY_FORMAT = "%Y%m%d%H%M%S%f"  # Formatting datetime instances
 TIME_INTERVAL = 60  # time slot size in minutes
 TIME_INTERVAL_UNIX = 60 * TIME_INTERVAL
 TIME_INT_INTERVAL = 60  # every increment by 1-integer converted to minutes e.g. 60 mins in 1 (deprecated)
-TIME_RELEASE_MAX = 50  # in units of TIME_INT_INTERVAL
-TIME_DEADLINE_MAX = 100  # in units of TIME_INT_INTERVAL
-REF_TIMESTAMP = int(datetime.strptime(REF_DATETIME, TIME_KEY_FORMAT).timestamp())
+TIME_RELEASE_MAX = DEFAULT_CONFIG.time_release_max  # in units of TIME_INT_INTERVAL
+TIME_DEADLINE_MAX = DEFAULT_CONFIG.time_deadline_max  # in units of TIME_INT_INTERVAL
+REF_TIMESTAMP = DEFAULT_CONFIG.ref_timestamp
+TIME_GRID = DEFAULT_CONFIG.time_grid  # grid of the default configuration, for datapoints created without a grid
 JOB_ENERGY_MIN = 50  # in kWh
 JOB_ENERGY_MAX = 200  # in kWh
 MARGIN_PRICE_TIME = 24  # in units of TIME_INT_INTERVAL used for extra offer info after job_id due-time
@@ -99,8 +225,8 @@ TOPIC_EXTERNAL_MARKET = ID_EXTERNAL_MARKET
 TOPIC_ECE = TOPIC_PLATFORM + TOPIC_SEPARATOR + ID_ECE
 TOPIC_MARKET = TOPIC_PLATFORM + TOPIC_SEPARATOR + ID_MARKET
 TOPIC_PLATFORM_NOTIFY_MACHINE_BIDS_GENERATED = TOPIC_PLATFORM_SUPER + "MACHINE_BIDS_GENERATED"
-TOPIC_PLATFORM_NOTIFY_MACHINE_BID_READY = TOPIC_PLATFORM_SUPER + "MACHINE_BID_READY"
 TOPIC_PLATFORM_MARKET_READY = TOPIC_PLATFORM_SUPER + "MARKET_READY"
+TOPIC_PLATFORM_AGENT_MOVED = TOPIC_PLATFORM_SUPER + "AGENT_MOVED"
 TOPIC_CC_CHECK_REQUESTS_QUEUE = "CC." + "Check_Requests_Queue"
 
 LIST_JOB_RECORD_FIELDS = list(JobRecField)
@@ -147,14 +273,4 @@ def time_str_to_int(time_string: str):
     return time_int
 
 
-# Function to create list of times between time and end time using TIME_INTERVAL
-def create_time_list(time_start, time_end):
-    time_list = []
-
-    delta_intervals = int((time_end - time_start) / TIME_INTERVAL_UNIX)
-    for i in range(delta_intervals):
-        time_list.append(time_start + (i * TIME_INTERVAL_UNIX))
-    return time_list
-
-
 print('CONFIG imported')
@@ -9,6 +9,10 @@ class ConfigProfile():
     TEST_LONG = 'LONG'
     CUSTOM = 'CUSTOM'
 
+    @staticmethod
+    def all():
+        return [ConfigProfile.TEST, ConfigProfile.TEST_LONG, ConfigProfile.CUSTOM]
+
 
 class SimParam():
     TIME_REF = 'TIME_REF'
@@ -16,29 +20,35 @@ class SimParam():
     NUM_JOBS = 'NUM_JOBS'
     NUM_AGENTS = 'NUM_AGENTS'
 
-
-config = ConfigParser()
-
-config[ConfigProfile.CUSTOM] = {
-    'TIME_REF': '20230109100000000000',
-    'NUM_JOBS': 20,
-    'NUM_MACHINES': 6,
-    'NUM_AGENTS': 3
-}
-
-config[ConfigProfile.TEST] = {
-    'TIME_REF': '20230109100000000000',
-    'NUM_JOBS': 10,
-    'NUM_MACHINES': 2,
-    'NUM_AGENTS': 5
-}
-
-config[ConfigProfile.TEST_LONG] = {
-    'TIME_REF': '20230109100000000000',
-    'NUM_JOBS': 150,
-    'NUM_MACHINES': 20,
-    'NUM_AGENTS': 50
-}
-
-with open('CONFIG_PROFILES.ini', 'w') as file:
-    config.write(file)
+    @staticmethod
+    def all():
+        return [SimParam.TIME_REF, SimParam.NUM_MACHINES, SimParam.NUM_JOBS, SimParam.NUM_AGENTS]
+
+
+# write the profiles to CONFIG_PROFILES.ini, only when run as a script (importing must not touch the file)
+if __name__ == "__main__":
+    config = ConfigParser()
+
+    config[ConfigProfile.CUSTOM] = {
+        'TIME_REF': '20230109100000000000',
+        'NUM_JOBS': 20,
+        'NUM_MACHINES': 6,
+        'NUM_AGENTS': 3
+    }
+
+    config[ConfigProfile.TEST] = {
+        'TIME_REF': '20230109100000000000',
+        'NUM_JOBS': 10,
+        'NUM_MACHINES': 2,
+        'NUM_AGENTS': 5
+    }
+
+    config[ConfigProfile.TEST_LONG] = {
+        'TIME_REF': '20230109100000000000',
+        'NUM_JOBS': 150,
+        'NUM_MACHINES': 20,
+        'NUM_AGENTS': 50
+    }
+
+    with open('CONFIG_PROFILES.ini', 'w') as file:
+        config.write(file)
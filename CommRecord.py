@@ -0,0 +1,78 @@
+# Fixed-layout record of the communication fields carried by mayflys, agents and drones
+# a layout is the tuple of fields of a role (CommField.factory() / CommField.bidding()) with the position of every
+# field computed once. A record keeps its values in a list in layout order, so filling an agent from a mayfly or a
+# drone from an agent of the same role is one slice assignment and a reset refills the list, no dict is built per hop.
+# Records support the dict operations used on the fields (item access, iteration over fields, get, in, len).
+# Size of a bidding record: 48 bytes for the record and 96 bytes for its value list, a dict with the same 5 fields
+# takes 232 bytes (CPython 3.10, 64 bit, as pinned in environment.yml).
+from Enums import CommField
+
+
+class CommLayout:
+    __slots__ = ('fields', 'positions', 'empty')
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.positions = {comm_field: position for position, comm_field in enumerate(self.fields)}
+        self.empty = [None] * len(self.fields)
+
+
+LAYOUT_EMPTY = CommLayout(())
+LAYOUT_FACTORY = CommLayout(CommField.factory())
+LAYOUT_BIDDING = CommLayout(CommField.bidding())
+
+
+class CommRecord:
+    __slots__ = ('layout', 'values')
+
+    def __init__(self, layout: CommLayout = LAYOUT_EMPTY):
+        self.layout = layout
+        self.values = layout.empty.copy()
+
+    # switch record to the fields of a layout, values are emptied if the layout changes
+    def set_layout(self, layout: CommLayout):
+        if layout is not self.layout:
+            self.layout = layout
+            self.values = layout.empty.copy()
+
+    # empty all values, the layout is kept
+    def reset(self):
+        self.values[:] = self.layout.empty
+
+    # take layout and values of another record
+    def copy_from(self, record: 'CommRecord'):
+        if record.layout is self.layout:
+            self.values[:] = record.values
+        else:
+            self.layout = record.layout
+            self.values = record.values.copy()
+
+    # take the values of the fields of this layout from another record, missing fields are None
+    def fill_from(self, record: 'CommRecord'):
+        if record.layout is self.layout:
+            self.values[:] = record.values
+        else:
+            for comm_field, position in self.layout.positions.items():
+                self.values[position] = record.get(comm_field)
+
+    def get(self, comm_field: CommField, default=None):
+        position = self.layout.positions.get(comm_field)
+        return default if position is None else self.values[position]
+
+    def __getitem__(self, comm_field: CommField):
+        return self.values[self.layout.positions[comm_field]]
+
+    def __setitem__(self, comm_field: CommField, value):
+        self.values[self.layout.positions[comm_field]] = value
+
+    def __contains__(self, comm_field: CommField):
+        return comm_field in self.layout.positions
+
+    def __iter__(self):
+        return iter(self.layout.fields)
+
+    def __len__(self):
+        return len(self.layout.fields)
+
+    def __repr__(self):
+        return repr(dict(zip(self.layout.fields, self.values)))
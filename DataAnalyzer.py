@@ -1,19 +1,22 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import networkx as nx
-import pymarket as pm
+from __future__ import annotations
 
-from Machine import Machine
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from Machine import Machine
 
 
 class DataAnalyzer:
     def __init__(self, machines):
+        import pandas as pd
+
         self.machines = machines
         self.quaderant_data: pd.DataFrame = pd.DataFrame(columns=['release', 'deadline', 'start', 'finish'])
 
     @staticmethod
     def box_plot(data: list):
+        import matplotlib.pyplot as plt
+
         plt.switch_backend('Qt5Agg')
         plt.boxplot(data)
         plt.show()
@@ -22,10 +22,12 @@ from DataPoint import JobDataPoint
 from ExternalMarket import ExtMarketData
 
 
-def generate_data():
-    n_jobs = CONFIG.N_JOBS  # Number of jobs to generate
-    n_machines = CONFIG.N_MACHINES  # Number of registered_entities to distribute jobs among
-    ref_time = CONFIG.REF_TIMESTAMP
+def generate_data(config: CONFIG.SimConfig = None):
+    config = config if config is not None else CONFIG.DEFAULT_CONFIG
+    n_jobs = config.n_jobs  # Number of jobs to generate
+    n_machines = config.n_machines  # Number of registered_entities to distribute jobs among
+    ref_time = config.ref_timestamp
+    interval = config.time_grid.interval  # time-slot size in seconds
 
     jobs = []  # List to store generated jobs
     max_time = 0  # store the maximum period for energy suppliers
@@ -33,23 +35,22 @@ def generate_data():
     duration_list = []  #  used for agent analysis
 
     for i in range(n_jobs):
-        job_id = CONFIG.NAME_JOB + str(i + 1).zfill(CONFIG.NAME_ZERO_FILL)
+        job_id = CONFIG.NAME_JOB + str(i + 1).zfill(config.name_zero_fill)
 
         # Random release time between 0 and 50
-        release_time = ref_time + random.randint(0, CONFIG.TIME_RELEASE_MAX) * CONFIG.TIME_INT_INTERVAL * 60
+        release_time = ref_time + random.randint(0, config.time_release_max) * interval
 
         # Random due time after release time
-        due_time = release_time + (random.randint(1, CONFIG.TIME_DEADLINE_MAX) * CONFIG.TIME_INT_INTERVAL * 60)
+        due_time = release_time + (random.randint(1, config.time_deadline_max) * interval)
 
         # Random duration that fits within release and due time
-        duration = random.randint(1, (due_time - release_time) /
-                                  (CONFIG.TIME_INT_INTERVAL * 60)) * CONFIG.TIME_INT_INTERVAL * 60
+        duration = random.randint(1, (due_time - release_time) // interval) * interval
 
         # random energy demand generation
         energy = round(random.uniform(CONFIG.JOB_ENERGY_MIN, CONFIG.JOB_ENERGY_MAX), 2)
 
         # random priority per job
-        priority = random.randint(0, CONFIG.PRIORITY_LEVELS - 1)
+        priority = random.randint(0, config.priority_levels - 1)
 
         # random number of job objectives
         objectives_num = random.randint(0, len(Enums.ObjectiveJob))
@@ -1,33 +1,28 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+import numpy as np
 
 import CONFIG
-from CONFIG import PRIORITY_DEFAULT, get_time_key, create_time_list
+from CONFIG import PRIORITY_DEFAULT, get_time_key
+from CommRecord import CommRecord, LAYOUT_FACTORY, LAYOUT_BIDDING
+from TimeGrid import TimeGrid
 from Enums import JobConstraint, JobStatus, ObjectiveJob, ObjectiveGeneral, CommField, EcoInfo,\
                   ScheduleSrc, MarketRole, BidStatus
 
 # Datapoints are used inside Tables in Queues and always keyed by their 'my_id'
+# messages passed with every agent hop (Request, Mayfly, Drone, Agent) are slotted, they keep no per-object dict
 
 # class for all employer datapoints
-@dataclass
+@dataclass(slots=True)
 class DataPoint:
     my_id: str = "DefaultDataPoint"
     priority: int = PRIORITY_DEFAULT
 
     def __post_init__(self):
-        self._my_id = self.my_id
         if not isinstance(self.my_id, str):
             raise ValueError('value not a string')
 
-    @property
-    def my_id(self):
-        return self._my_id
-
-    @my_id.setter
-    def my_id(self, value):
-        self._my_id = value
-
 
 # class for a single job_id entry
 @dataclass
@@ -60,50 +55,74 @@ class JobDataPoint(DataPoint):
 
 # class for estimated list of prices
 # this is used for estimation in employer to FCA agent and ECE
+# time_slots and prices are NumPy arrays on the time grid, so a slot is found by index arithmetic
 @dataclass
 class EstimationDataPoint(DataPoint):
     timestamp: str = get_time_key()  # store the time of estimation
     data_id: str = ""
-    time_slots: [str] = field(default_factory=list)
-    prices: [float] = field(default_factory=list)
+    time_slots: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    prices: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    missing: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))  # mask of slots without a price
     info_type: EcoInfo = EcoInfo.WHOLESALE
+    time_grid: TimeGrid = field(default=None, repr=False, compare=False)  # grid of the requester's configuration
 
     def __post_init__(self):
         self.my_id = self.timestamp
 
     # create new EstimationDataPoint based on job_id data_response
     @staticmethod
-    def create_from_job(job: JobDataPoint):
-        estimation = EstimationDataPoint()
+    def create_from_job(job: JobDataPoint, time_grid: TimeGrid):
+        estimation = EstimationDataPoint.create_from_interval(start=job.time_ready, finish=job.time_deadline,
+                                                              time_grid=time_grid)
         estimation.priority = job.priority  # priority same as job_id priority
-        estimation.time_slots = create_time_list(job.time_ready, job.time_deadline +
-                                                 (CONFIG.MARGIN_PRICE_TIME * CONFIG.TIME_INTERVAL_UNIX))
-        estimation.prices = [0.0 for i in range(len(estimation.time_slots))]
         estimation.my_id = job.my_id
         return estimation
 
     @staticmethod
-    def create_from_interval(start: int, finish: int):
-        estimation = EstimationDataPoint()
+    def create_from_interval(start: int, finish: int, time_grid: TimeGrid):
+        estimation = EstimationDataPoint(time_grid=time_grid)
         estimation.priority = PRIORITY_DEFAULT
-        estimation.time_slots = create_time_list(start, finish +
-                                                 (CONFIG.MARGIN_PRICE_TIME * CONFIG.TIME_INTERVAL_UNIX))
-        estimation.prices = [0.0 for i in range(len(estimation.time_slots))]
+        estimation.time_slots = time_grid.time_range(start, finish + (CONFIG.MARGIN_PRICE_TIME * time_grid.interval))
+        estimation.prices = np.zeros(len(estimation.time_slots))
+        estimation.missing = np.zeros(len(estimation.time_slots), dtype=bool)
         return estimation
 
+    # index of a time-slot inside the estimation
+    def slot_index(self, time: int) -> int:
+        index = None
+        if len(self.time_slots):
+            index = self.time_grid.offset(time_start=self.time_slots[0], time=time, count=len(self.time_slots))
+        if index is None:
+            raise ValueError(f"{time} is not a time-slot of estimation {self.my_id}")
+        return index
+
     def get_price(self, time: int):
-        index = self.time_slots.index(time)
-        return self.prices[index]
+        return self.prices[self.slot_index(time)]
+
+    # estimation of the interval [start, finish] as a view of this estimation, None if not covered
+    def window(self, start: int, finish: int):
+        count = self.time_grid.count(start, finish + (CONFIG.MARGIN_PRICE_TIME * self.time_grid.interval))
+        index = self.time_grid.offset(time_start=self.time_slots[0], time=start, count=len(self.time_slots)) \
+            if len(self.time_slots) else None
+        if index is None or index + count > len(self.time_slots):
+            return None
+        estimation = EstimationDataPoint(timestamp=self.timestamp, priority=self.priority, info_type=self.info_type,
+                                         time_slots=self.time_slots[index:index + count],
+                                         prices=self.prices[index:index + count],
+                                         missing=self.missing[index:index + count], time_grid=self.time_grid)
+        return estimation
 
 
 # class for a single live agent entry in AgentHandler
 # used to shadow offer and agent requests
-@dataclass
+@dataclass(slots=True)
 class Request(DataPoint):
     request_id: str = ""
     source_id: str = ""
     destination_id: str = ""
     data_id: str = ""
+    deadline: int = None  # time-slot the requested data is needed for, None if not bound to a time-slot
+    time_requested: float = 0.0  # perf_counter time the request reached the CC
 
     def __post_init__(self):
         if not isinstance(self.request_id, str):
@@ -263,10 +282,24 @@ class BidSlot(BidFeedback):
         return f"{self.slot}: {self.offer}"
 
 
+# class for a range of equal bids generated from one schedule-slot
+@dataclass
+class BidRange:
+    time_start: int = 0
+    count: int = 0  # number of time-slots in the range
+    counter_start: int = 0  # number of bids of the job before this range
+    energy: float = 0.0
+    offer: float = 0.0
+
+    def __str__(self):
+        return f"{self.time_start}+{self.count}x{CONFIG.TIME_INTERVAL_UNIX}: {self.offer}"
+
+
 # class to encapsulate job bids
+# bids are stored as ranges of time-slots, a BidSlot is only created when its time-slot is accessed
 @dataclass
 class BidJob(DataPoint):
-    my_id: str = CONFIG.NAME_BID_JOB + str(0).zfill(CONFIG.NAME_ZERO_FILL)
+    my_id: str = None  # numbered with the zero fill if not given
     job_id: str = ""
     time_start: int = 0
     time_finish: int = 0
@@ -274,48 +307,63 @@ class BidJob(DataPoint):
     source_strategy: str = ""
     source_schedule: ScheduleSrc = ScheduleSrc.NONE
     bid_priority: int = 0
-    bids: [BidSlot] = field(default_factory=list)
+    bid_ranges: [BidRange] = field(default_factory=list)
+    num_bids: int = 0
+    bids: dict = field(default_factory=dict)  # BidSlots created so far, keyed by time-slot
+    time_grid: TimeGrid = field(default=None, repr=False, compare=False)  # grid of the machine's configuration
+    name_zero_fill: int = field(default=0, repr=False, compare=False)  # zero fill of the machine's configuration
+
+    def __post_init__(self):
+        if self.my_id is None:
+            self.my_id = CONFIG.NAME_BID_JOB + str(0).zfill(self.name_zero_fill)
+        DataPoint.__post_init__(self)
 
     def get_bid(self, time: int) -> BidSlot:
-        for bid in self.bids:
-            if bid.slot == time:
+        # return bid if already created
+        if time in self.bids:
+            return self.bids[time]
+        # otherwise create bid from its range
+        for bid_range in self.bid_ranges:
+            index = self.time_grid.offset(time_start=bid_range.time_start, time=time, count=bid_range.count)
+            if index is not None:
+                bid_counter = bid_range.counter_start + index + 1
+                bid = BidSlot(bid_id=self.my_id + CONFIG.NAME_BID_SLOT + str(bid_counter).zfill(self.name_zero_fill),
+                              priority=self.priority,
+                              source_id=self.source_entity, energy=bid_range.energy, slot=time,
+                              source_data=self.job_id,
+                              offer=bid_range.offer)
+                self.bids[time] = bid
                 return bid
 
     def is_time_inside(self, time: int):
-        return any([bid.slot == time for bid in self.bids])
+        return any(self.time_grid.offset(time_start=bid_range.time_start, time=time, count=bid_range.count)
+                   is not None for bid_range in self.bid_ranges)
 
     def bids_from_schedule_slot(self, slot: ScheduleSlot, markup):
         # update time_start and time_finish
         self.time_start = slot.time_start if self.time_start >= -slot.time_start else self.time_start
         self.time_finish = slot.time_finish if self.time_finish <= slot.time_finish else self.time_finish
 
-        # create time_list to generate bid times
-        time_list = create_time_list(time_start=slot.time_start, time_end=slot.time_finish)
-        # Generate bid per time-slot
-        bid_counter = 0
-        for index in range(len(time_list)):
-            bid_counter += 1
-            self.bids.append(BidSlot(bid_id=self.my_id + CONFIG.NAME_BID_SLOT
-                                           + str(bid_counter).zfill(CONFIG.NAME_ZERO_FILL),
-                                     priority=self.priority,
-                                     source_id=self.source_entity, energy=slot.energy, slot=time_list[index],
-                                     source_data=self.job_id,
-                                     offer=slot.cost + (slot.cost * markup)))
+        # Generate one bid per time-slot as a range over the time grid
+        count = self.time_grid.count(time_start=slot.time_start, time_end=slot.time_finish)
+        self.bid_ranges.append(BidRange(time_start=slot.time_start, count=count, counter_start=self.num_bids,
+                                        energy=slot.energy, offer=slot.cost + (slot.cost * markup)))
+        self.num_bids += count
 
     def __str__(self):
         return f"Job-Bids Job: {self.job_id}\n\tschedule: {self.source_schedule}, priority:{self.priority}," \
                f" start: {self.time_start}, finish: {self.time_finish}\n" +\
-               "\t" + " ".join([str(bid) + " " for bid in self.bids])
+               "\t" + " ".join([str(bid_range) + " " for bid_range in self.bid_ranges])
 
 
 
 # class used to save data_response that agent needs to perform its role
-@dataclass
+@dataclass(slots=True)
 class Mayfly(DataPoint):
     request_id: str = ""
     data_id: str = ""
 
-    data: dict = field(default_factory=dict)
+    data: CommRecord = field(default_factory=CommRecord)
     response_data: DataPoint = None
     return_action: callable = None
 
@@ -348,12 +396,18 @@ class Mayfly(DataPoint):
 
     def create_factory_params(self, time_start: int,
                               time_finish: int, data_type: EcoInfo):
+        self.data.set_layout(LAYOUT_FACTORY)
         self.data[CommField.TIME_START] = time_start
         self.data[CommField.TIME_FINISH] = time_finish
         self.data[CommField.ECO_INFO] = data_type
         self.data[CommField.DATA_ID] = self.data_id
 
+    # time-slot the data of the mayfly is needed for: slot of a bid or start of an estimation
+    def get_deadline(self):
+        return self.data.get(CommField.TIME_SLOT, self.data.get(CommField.TIME_START))
+
     def create_bidding_params(self, bid_id: str, time_slot: int, energy: float, price: float, role: MarketRole):
+        self.data.set_layout(LAYOUT_BIDDING)
         self.data[CommField.BID_ID] = bid_id
         self.data_id = bid_id
         self.data[CommField.TIME_SLOT] = time_slot
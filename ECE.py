@@ -1,18 +1,21 @@
 # class for temporary ECE
-import pubsub.pub
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from loguru import logger
-from pubsub import pub
 
 import CONFIG
 from Enums import CommField
 from Agent import Drone
 from DataPoint import EstimationDataPoint
 from PlatformEntity import Service
+from PriceMemoryCache import PriceMemoryCache
+from PriceSource import PriceSource
 import smard_de
 
 
 class ECE(Service):
-    def __init__(self, platform):
+    def __init__(self, platform, price_source: PriceSource = None):
         # constants used to identify module
         self.logging_key_word = "estimation"
         self.service_id = CONFIG.NAME_REQUEST_ESTIMATION
@@ -20,65 +23,191 @@ class ECE(Service):
 
         self.topic = CONFIG.TOPIC_ECE
 
-        # create table ECE table
-        self.price_estimates = {}
+        # create table ECE table: week stamp -> sorted (timestamps, prices) arrays of the week block
+        # bounded by a byte budget, least recently used week blocks are evicted
+        self.price_estimates = PriceMemoryCache(max_bytes=platform.config.price_memory_bytes,
+                                                revalidate_after=platform.config.price_revalidate)
+        # source of the week blocks (smard.de, local file or synthetic)
+        self.price_source = price_source if price_source is not None else PriceSource.from_config(platform.config)
+        # pool for fetching week blocks concurrently, created on first concurrent fetch
+        self.prefetch_workers = platform.config.prefetch_workers
+        self.prefetch_adjacent = platform.config.prefetch_adjacent
+        self.prefetch_pool: ThreadPoolExecutor = None
+        # calendar of week blocks, precomputed for the horizon jobs can be released and due in
+        time_horizon = (platform.config.time_release_max + platform.config.time_deadline_max +
+                        CONFIG.MARGIN_PRICE_TIME) * platform.config.time_grid.interval
+        self.week_calendar = smard_de.WeekCalendar(time_start=platform.config.ref_timestamp,
+                                                   time_end=platform.config.ref_timestamp + time_horizon)
+
+        # recent estimations computed over a union of requested ranges with the week stamps of their week blocks,
+        # requests inside them are served as views while the week blocks are fresh in the memory cache
+        self.estimations_union: [(EstimationDataPoint, [int])] = []
+        self.num_estimations_union = 8
+        # counters of requests served and estimations computed for them
+        self.num_requests = 0
+        self.num_estimations = 0
 
     def execute_service(self, data_drone: Drone):
         self.get_estimates(data_drone=data_drone)
 
     # execute service for each service_to_start
     def on_new_request(self):
-        while not self.services_to_start.is_empty():
-            # get data_drone from to-start queue
-            service_drone = self.services_to_start.get()
-            # put agent drone in in-progress table
+        # get data_drones from to-start queue
+        data_drones = self.services_to_start.drain()
+        # put agent drones in in-progress table
+        for service_drone in data_drones:
             self.services_in_progress.insert(service_drone)
-            # execute service on agent
-            self.execute_service(data_drone=service_drone)
+        # execute service once per group of queued requests with overlapping ranges
+        for data_drones_group in self.group_overlapping(data_drones):
+            self.get_estimates_coalesced(data_drones=data_drones_group)
 
     # Get estimates from sources
     def get_estimates(self, data_drone: Drone):
-        # return agent is EstimationDatapoint
-        data = EstimationDataPoint.create_from_interval(start=data_drone.data_to_find[CommField.TIME_START],
-                                                        finish=data_drone.data_to_find[CommField.TIME_FINISH])
-        data.data_id = data_drone.data_id
-        data.priority = data_drone.priority
-        # timestamp when estimation data_response was generated
-        data.timestamp = CONFIG.get_time_key()
+        self.get_estimates_coalesced(data_drones=[data_drone])
 
-        # get agent for each time slot
-        for slot in data.time_slots:
-            week_stamp = smard_de.smard_timestamp(slot)
-            # check whether data_response for needed timeslots has already been requested
-            if week_stamp in self.price_estimates:
-                pass
-            else:
-                # logging
-                logger.info(self.my_id + ' ' + f'requesting data from smard.de for timestamp {week_stamp}')
-                # data_response prices from smard
-                self.price_estimates[week_stamp] = \
-                    smard_de.get_wholesale_prices(week_stamp)  # data_drone.data_to_find[CommField.ECO_INFO].value)
-
-            # check if timeslot has data_response available
-            if slot in self.price_estimates[week_stamp]:
-                # insert data_response according to current period into prices list with same index
-                data.prices[data.time_slots.index(slot)] = self.price_estimates[week_stamp][slot]
-            else:
-                # logging
-                logger.info(self.my_id + ' ' + f'cannot provide data for timestamp {slot}')
+    # get estimates for requests with overlapping ranges by one estimation over the union range
+    def get_estimates_coalesced(self, data_drones: [Drone]):
+        start = min(data_drone.data_to_find[CommField.TIME_START] for data_drone in data_drones)
+        finish = max(data_drone.data_to_find[CommField.TIME_FINISH] for data_drone in data_drones)
+        estimation = next((estimation for estimation, week_stamps in self.estimations_union
+                           if estimation.window(start=start, finish=finish) is not None
+                           and all(week_stamp in self.price_estimates for week_stamp in week_stamps)), None)
+        if estimation is None:
+            estimation = self.estimate_interval(start=start, finish=finish)
+            week_stamps = np.unique(self.week_calendar.week_stamps(estimation.time_slots)).tolist()
+            self.estimations_union = [(estimation, week_stamps)] + \
+                [(estimation_union, week_stamps_union) for estimation_union, week_stamps_union
+                 in self.estimations_union[:self.num_estimations_union - 1]
+                 if estimation_union.window(start=start, finish=finish) is None]
+
+        for data_drone in data_drones:
+            # return agent is EstimationDatapoint, a read-only view of the requester's range in the union
+            data = estimation.window(start=data_drone.data_to_find[CommField.TIME_START],
+                                     finish=data_drone.data_to_find[CommField.TIME_FINISH])
+            data.data_id = data_drone.data_id
+            data.priority = data_drone.priority
+            # timestamp when estimation data_response was generated
+            data.timestamp = estimation.timestamp
 
-        # save new estimation in data_drone
-        data_drone.data_response = data
+            # save new estimation in data_drone
+            data_drone.data_response = data
 
-        # remove data_drone from in-progress table
-        self.services_in_progress.remove(data_drone.my_id)
+            # remove data_drone from in-progress table
+            self.services_in_progress.remove(data_drone.my_id)
 
-        # put data_drone in completed queue
-        self.services_completed.put(data_drone)
+            # put data_drone in completed queue
+            self.services_completed.put(data_drone)
+        self.num_requests += len(data_drones)
 
         # trigger completed-estimation event
         self.on_service_completed()
 
+    # compute estimation over an interval from the week blocks
+    def estimate_interval(self, start: int, finish: int) -> EstimationDataPoint:
+        data = EstimationDataPoint.create_from_interval(start=start, finish=finish,
+                                                        time_grid=self.platform.config.time_grid)
+        # timestamp when estimation data_response was generated
+        data.timestamp = CONFIG.get_time_key()
+        self.num_estimations += 1
+
+        # week block of each time slot, time slots are sorted so each week is a contiguous segment
+        slots = data.time_slots
+        week_stamps = self.week_calendar.week_stamps(slots)
+        week_stamps_unique, segments_start = np.unique(week_stamps, return_index=True)
+        # fetch all week blocks that were not requested yet at once, plus the following week
+        week_blocks = self.fetch_week_blocks(week_stamps=week_stamps_unique.tolist())
+
+        # get agent for each week block with one search and gather
+        segments_end = np.append(segments_start[1:], len(slots))
+        for week_stamp, segment_start, segment_end in zip(week_stamps_unique.tolist(), segments_start, segments_end):
+            timestamps, prices = week_blocks[week_stamp]
+            segment_slots = slots[segment_start:segment_end]
+            indexes = np.minimum(np.searchsorted(timestamps, segment_slots), max(len(timestamps) - 1, 0))
+            # check which timeslots have data_response available
+            found = timestamps[indexes] == segment_slots if len(timestamps) else np.zeros(len(segment_slots), bool)
+            # insert data_response according to current period into prices with same index
+            data.prices[segment_start:segment_end][found] = prices[indexes[found]]
+            data.missing[segment_start:segment_end] = ~found
+
+        if data.missing.any():
+            # logging
+            logger.info(self.my_id + ' ' + f'cannot provide data for {int(data.missing.sum())} timestamps, '
+                                           f'first {int(slots[data.missing][0])}')
+
+        # estimation is shared between requesters, so it cannot be changed
+        data.time_slots.flags.writeable = False
+        data.prices.flags.writeable = False
+        data.missing.flags.writeable = False
+        return data
+
+    # group requests whose ranges overlap (on the same time grid), groups are sorted by range start
+    @staticmethod
+    def group_overlapping(data_drones: [Drone]) -> [[Drone]]:
+        groups = []
+        finish_group = None
+        for data_drone in sorted(data_drones, key=lambda drone: drone.data_to_find[CommField.TIME_START]):
+            start = data_drone.data_to_find[CommField.TIME_START]
+            finish = data_drone.data_to_find[CommField.TIME_FINISH]
+            if groups and start <= finish_group and \
+                    (start - groups[-1][0].data_to_find[CommField.TIME_START]) % CONFIG.TIME_INTERVAL_UNIX == 0:
+                groups[-1].append(data_drone)
+                finish_group = max(finish_group, finish)
+            else:
+                groups.append([data_drone])
+                finish_group = finish
+        return groups
+
+    # get week blocks, missing ones are fetched from the price source, concurrently if the source is waiting on I/O
+    # the blocks are returned, so they can be used even if the cache evicts them
+    # weeks that cannot be fetched are returned as empty blocks, a price source failure does not stop the platform
+    def fetch_week_blocks(self, week_stamps: list) -> dict:
+        week_blocks = {week_stamp: self.price_estimates[week_stamp] for week_stamp in week_stamps
+                       if week_stamp in self.price_estimates}
+        week_stamps_missing = [week_stamp for week_stamp in week_stamps if week_stamp not in week_blocks]
+        if not week_stamps_missing:
+            return week_blocks
+        # prefetch the week after the requested ones, its failure does not affect the current request
+        week_stamps_prefetch = []
+        if self.prefetch_adjacent:
+            week_stamp_next = self.week_calendar.week_stamp(max(week_stamps) // 1000 + PriceSource.WEEK_SECONDS
+                                                            + 12 * 3600)
+            if week_stamp_next not in self.price_estimates and week_stamp_next not in week_stamps_missing:
+                week_stamps_prefetch.append(week_stamp_next)
+
+        # logging
+        logger.info(self.my_id + ' ' + f'requesting data from price source for timestamps {week_stamps_missing}')
+        week_stamps_fetch = week_stamps_missing + week_stamps_prefetch
+        if self.price_source.io_bound and len(week_stamps_fetch) > 1:
+            if self.prefetch_pool is None:
+                self.prefetch_pool = ThreadPoolExecutor(max_workers=self.prefetch_workers,
+                                                        thread_name_prefix=self.my_id + 'Prefetch')
+            futures = [self.prefetch_pool.submit(self.price_source.get_week_block, week_stamp)
+                       for week_stamp in week_stamps_fetch]
+        else:
+            futures = None
+
+        for index, week_stamp in enumerate(week_stamps_fetch):
+            # data_response prices from price source
+            try:
+                if futures is None:
+                    timestamps, prices = self.price_source.get_week_block(week_stamp)
+                else:
+                    timestamps, prices = futures[index].result()
+                # data_drone.data_to_find[CommField.ECO_INFO].value)
+                week_block = (np.asarray(timestamps, dtype=np.int64), np.asarray(prices))
+                self.price_estimates[week_stamp] = week_block
+            except Exception as error:
+                # a failed prefetch is retried when the week is actually requested
+                if week_stamp not in week_stamps_missing:
+                    logger.info(self.my_id + ' ' + f'prefetch of week {week_stamp} failed: {error}')
+                    continue
+                # week block not found (e.g. offline and neither cached nor a fixture) or the fetch failed:
+                # its slots are reported as missing and the block is not cached, so it is requested again
+                logger.info(self.my_id + ' ' + f'fetch of week {week_stamp} failed: {error}')
+                week_block = (np.zeros(0, dtype=np.int64), np.zeros(0))
+            week_blocks[week_stamp] = week_block
+        return week_blocks
+
     def register_in_platform(self):
         self.cc = self.platform.fcc
-        pub.subscribe(self.receive_agent, topicName=self.topic)
+        self.platform.register_route(entity_id=self.my_id, receive_agent=self.receive_agent)
@@ -0,0 +1,55 @@
+# Discrete-event clock of the bidding rounds
+# keeps a sorted index of the time-slots that have machine bids, with the number of bids per slot, so the platform
+# jumps from one active slot to the next instead of running a market round for every slot of the horizon.
+# Supplier offers are not tracked: a round without any demand cannot trade.
+# Bids cover consecutive slots, so adding or removing them merges one sorted window of the slot index in a single pass.
+from bisect import bisect_left, bisect_right
+
+from TimeGrid import TimeGrid
+
+
+class EventClock:
+    def __init__(self, time_grid: TimeGrid):
+        self.time_grid = time_grid
+        # sorted timestamps of active slots and number of bids per active slot
+        self.slots = []
+        self.counts = {}
+
+    # add bids at count consecutive slots starting at time_start
+    def add(self, time_start: int, count: int = 1):
+        times = self.time_grid.time_range(time_start, time_start + count * self.time_grid.interval).tolist()
+        if not times:
+            return
+        for time in times:
+            self.counts[time] = self.counts.get(time, 0) + 1
+        # all slots of the range are active now, so the window of the range in the index is the range itself
+        self.slots[bisect_left(self.slots, times[0]):bisect_right(self.slots, times[-1])] = times
+
+    # remove bids at count consecutive slots starting at time_start, slots without bids become inactive
+    def remove(self, time_start: int, count: int = 1):
+        times = self.time_grid.time_range(time_start, time_start + count * self.time_grid.interval).tolist()
+        num_inactive = 0
+        for time in times:
+            num = self.counts.get(time, 0)
+            if num > 1:
+                self.counts[time] = num - 1
+            elif num == 1:
+                del self.counts[time]
+                num_inactive += 1
+        if num_inactive:
+            position_start = bisect_left(self.slots, times[0])
+            position_end = bisect_right(self.slots, times[-1])
+            self.slots[position_start:position_end] = [time for time in self.slots[position_start:position_end]
+                                                       if time in self.counts]
+
+    # first active slot after time, None if no slot is active after time
+    def next_time(self, time: int):
+        position = bisect_right(self.slots, time)
+        return self.slots[position] if position < len(self.slots) else None
+
+    # check if a slot has bids
+    def is_active(self, time: int) -> bool:
+        return time in self.counts
+
+    def __len__(self):
+        return len(self.slots)
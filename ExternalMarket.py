@@ -2,7 +2,6 @@ import random
 from abc import ABC
 from enum import Enum
 from loguru import logger
-from pubsub import pub
 
 import CONFIG
 from Enums import EcoInfo, MarketRole
@@ -31,15 +30,15 @@ class ExternalMarket(PlatformEntity):
         self.agents_handler = AgentHandler(self, super_topic=self.my_id)
 
         self.data_energy = []
-        self.data_supply_period_start = CONFIG.REF_TIMESTAMP
+        self.data_supply_period_start = platform.config.ref_timestamp
         self.data_supply_period_finish = 0
-        self.data_prices: dict = {}  # EstimationDataPoint = None
+        self.data_prices: EstimationDataPoint = None
 
         # variable to track bidding requests
         self._request_id: int = 0
 
         # subscribe to topic that indicates when market is ready
-        pub.subscribe(self.start_bidding_round, topicName=CONFIG.TOPIC_PLATFORM_MARKET_READY)
+        platform.bus.subscribe(self.start_bidding_round, topicName=CONFIG.TOPIC_PLATFORM_MARKET_READY)
 
     # function to take supplier data_response and generate requests for market estimations
     # determine beginning and end time for energy supply period
@@ -71,10 +70,12 @@ class ExternalMarket(PlatformEntity):
         for supplier in self.suppliers:
             bids = supplier.get_bids_time(time=time_current)
             bid_mayflys.extend(self.bids_to_mayflys(bids))
-        # agent bidding agent for each bid
-        for mayfly in bid_mayflys:
-            self.agents_handler.request_bidding_agent(request_data=mayfly)
-        pass
+        # declare bids to the round barrier
+        if bid_mayflys:
+            self.platform.barrier.expect(party=self.my_id, count=len(bid_mayflys))
+        # agent bidding agent for each bid, submitted as one batch
+        if bid_mayflys:
+            self.agents_handler.request_bidding_agents(requests_data=bid_mayflys)
 
     # Helper Methods
 
@@ -92,13 +93,13 @@ class ExternalMarket(PlatformEntity):
     # function to callback when bid returns
     def set_bid_feedback(self, bid_fb: BidFeedback):
         for supplier in self.suppliers:
-            for bid in supplier.bids:
+            for bid in supplier.bids.values():
                 if bid_fb is bid:
                     bid.see_market_results(bid_fb)
 
     # method to add acquired prices using EstimationDatapoints
     def add_prices(self, estimates: EstimationDataPoint):
-        self.data_prices = {estimates.time_slots[i]: estimates.prices[i] for i in range(len(estimates.prices))}
+        self.data_prices = estimates
 
         self.on_estimation_acquired()
 
@@ -114,13 +115,12 @@ class ExternalMarket(PlatformEntity):
             # create supplier with unique_id
             margin = round(random.uniform(CONFIG.PRICE_SUPPLY_MARGIN_MIN, CONFIG.PRICE_SUPPLY_MARGIN_MAX), 4)
             supplier = Supplier(market=self, energy=self.data_energy[i], margin=margin)
-            supplier.register_with_external_market(my_id=CONFIG.NAME_SUPPLIER + str(i + 1).zfill(CONFIG.NAME_ZERO_FILL))
+            supplier.register_with_external_market(my_id=CONFIG.NAME_SUPPLIER +
+                                                    str(i + 1).zfill(self.platform.config.name_zero_fill))
             self.suppliers.append(supplier)
 
-            # loop for bid generation in supplier
-            for j in range(len(self.data_prices.keys())):
-                supplier.add_bid(time=list(self.data_prices.keys())[j], price=list(self.data_prices.values())[j])
-                pass
+            # bid generation in supplier, all suppliers share the estimated prices
+            supplier.add_prices(estimates=self.data_prices)
 
     # register related services
     def register_in_platform(self):
@@ -143,23 +143,32 @@ class Supplier:
         self.energy = energy
         self.pricing = 1 + margin  # deviation from nominal pricing
         # self.time_generation: ScheduleSlot = None  # supply availability time in a day
-        self.bids: [BidSlot] = []
+        self.bids: dict = {}  # BidSlots created so far, keyed by time-slot
         self.bid_counter = 0
+        # estimated prices that bids are generated from
+        self.prices: EstimationDataPoint = None
 
     # function to get bids at certain time
     def get_bids_time(self, time: int):
-        bids = []
-        for bid in self.bids:
-            if bid.slot == time:
-                bids.append(bid)
-        return bids
+        # create bid from estimated prices on first access of the time-slot
+        if time not in self.bids and self.prices is not None:
+            try:
+                self.add_bid(time=time, price=float(self.prices.get_price(time)))
+            except ValueError:
+                # no estimated price at this time-slot, no bid
+                pass
+        return [self.bids[time]] if time in self.bids else []
+
+    # function to offer energy at all time-slots of the estimated prices
+    def add_prices(self, estimates: EstimationDataPoint):
+        self.prices = estimates
 
     def add_bid(self, time, price):
         self.bid_counter += 1
-        self.bids.append(BidSlot(bid_id=self.my_id + CONFIG.NAME_BID_SLOT + str(self.bid_counter),
-                                 priority=CONFIG.PRIORITY_DEFAULT,
-                                 source_id=self.my_id, energy=self.energy, slot=time,
-                                 offer=price * self.pricing))
+        self.bids[time] = BidSlot(bid_id=self.my_id + CONFIG.NAME_BID_SLOT + str(self.bid_counter),
+                                  priority=CONFIG.PRIORITY_DEFAULT,
+                                  source_id=self.my_id, energy=self.energy, slot=time,
+                                  offer=price * self.pricing)
 
     # register useful components of the external markets
     def register_with_external_market(self, my_id: str):
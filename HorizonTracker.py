@@ -0,0 +1,41 @@
+# Market horizon: last bidding time over all bids that are currently placed
+# finish times are kept as a counted multiset with a max-heap on top; a withdrawn time stays in the heap until it
+# reaches the top and is dropped there (lazy deletion), so adding, withdrawing and reading the horizon stay cheap
+from heapq import heappop, heappush
+
+
+class HorizonTracker:
+    def __init__(self):
+        # finish time -> number of bids finishing at that time
+        self.counts = {}
+        # negated finish times, may contain times without bids anymore
+        self.heap = []
+        self.num_bids = 0
+
+    # add the finish time of a bid
+    def add(self, time: int):
+        num = self.counts.get(time, 0)
+        if not num:
+            heappush(self.heap, -time)
+        self.counts[time] = num + 1
+        self.num_bids += 1
+
+    # withdraw the finish time of a bid
+    def remove(self, time: int):
+        num = self.counts[time]
+        if num > 1:
+            self.counts[time] = num - 1
+        else:
+            del self.counts[time]
+        self.num_bids -= 1
+
+    # last finish time over all bids, None if there are no bids
+    @property
+    def time_last(self):
+        # drop withdrawn times from the top of the heap
+        while self.heap and -self.heap[0] not in self.counts:
+            heappop(self.heap)
+        return -self.heap[0] if self.heap else None
+
+    def __len__(self):
+        return self.num_bids
@@ -0,0 +1,37 @@
+# Bounded statistics of latencies
+# count, sum and maximum cover all samples, percentiles are computed over the most recent samples only,
+# so memory stays constant however long the platform runs
+from collections import deque
+
+import numpy as np
+
+
+class LatencyStats:
+    def __init__(self, max_samples: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # most recent samples, used for percentiles
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, latency: float):
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+        self.samples.append(latency)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    # percentiles of the recent samples
+    def percentiles(self, percentiles=(50, 90, 99)) -> dict:
+        if not self.samples:
+            return {}
+        return dict(zip(percentiles, np.percentile(self.samples, percentiles).tolist()))
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        return f"{self.count} samples, mean {self.mean() * 1000:.2f}ms, max {self.max * 1000:.2f}ms"
@@ -1,7 +1,5 @@
 # main employer class
-import pubsub.pub
 from loguru import logger
-from pubsub import pub
 
 # all employer submodules and intelligence happen here
 import CONFIG
@@ -19,8 +17,9 @@ from PlatformEntity import PlatformEntity
 class Machine(PlatformEntity):
     def __init__(self, platform):
         super().__init__()
-        # register platform
+        # register platform and its simulation parameters
         self.platform = platform
+        self.config: CONFIG.SimConfig = platform.config
 
         # Declare employer sub-modules
         self.agents_handler = AgentHandler(employer=self, super_topic=CONFIG.TOPIC_SUPER_MACHINES)
@@ -36,7 +35,7 @@ class Machine(PlatformEntity):
         self._request_id = 0
 
         # subscribe to topic that indicates when market is ready
-        pub.subscribe(self.start_bidding_round, topicName=CONFIG.TOPIC_PLATFORM_MARKET_READY)
+        self.platform.bus.subscribe(self.start_bidding_round, topicName=CONFIG.TOPIC_PLATFORM_MARKET_READY)
 
     # event response functions
 
@@ -75,10 +74,9 @@ class Machine(PlatformEntity):
         self.agents_handler.request_factory_agent(request_data=price_mayfly)
 
     # event triggered when bids are generated
-    @staticmethod
-    def on_bids_generated():
+    def on_bids_generated(self):
         # notify platform that bids are ready
-        pub.sendMessage(topicName=CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BIDS_GENERATED)
+        self.platform.bus.sendMessage(topicName=CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BIDS_GENERATED)
         # self.platform.machine_bids_generated()
         pass
 
@@ -88,11 +86,12 @@ class Machine(PlatformEntity):
     def start_bidding_round(self):
         # check if bid is available at current time
         time_current = self.platform.time_running
-        # inform platform that bids are ready
-        # self.platform.machine_bid_ready()
-        pub.sendMessage(topicName=CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BID_READY)
+        # prices of past slots are not needed anymore
+        self.records_keeper.release_prices_before(time=time_current)
         # check if bid exists for current bidding time
         if self.bidder.is_bid_time(time=time_current):
+            # declare bid to the round barrier
+            self.platform.barrier.expect(party=self.my_id)
             # log bid submission
             logger.info(self.my_id + f": bid submitted for time: {time_current}")
             # prepare bid agent
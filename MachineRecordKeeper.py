@@ -1,6 +1,6 @@
 # class for Machine submodule: Record Keeper
 # Keeps the records and logs needed for strategies and all decision-making
-import pandas as pd
+import numpy as np
 
 import CONFIG
 import Enums
@@ -11,14 +11,21 @@ from PlatfromHashTable import PlatformHashTable
 
 class MachineRecordKeeper():
     def __init__(self, machine):
+        # pandas is imported when the first machine is created, not when the platform module is imported
+        import pandas as pd
+
         self.machine = machine
+        self.time_grid = machine.platform.config.time_grid
 
         # record of added jobs
         self.jobs_record = pd.DataFrame(columns=CONFIG.LIST_JOB_RECORD_FIELDS)
         self.jobs_index = {}
         self.prices_record = PlatformHashTable()
         self.schedules_record = {}
-        self.price_estimates = {}
+        # prices on the time grid: price_estimates[i] is the price of slot index (price_index_first + i)
+        self.price_index_first = 0
+        self.price_estimates = np.zeros(0)
+        self.price_known = np.zeros(0, dtype=bool)
 
     def add_job(self, job: JobDataPoint):
         # create new job entry from JobDataPoint to insert into record
@@ -36,21 +43,46 @@ class MachineRecordKeeper():
 
     # TODO: handle EcoInfo types
     def add_prices(self, new_prices: EstimationDataPoint):
-        prices = new_prices.prices
-
         # insert offer datapoint in record
         self.prices_record.insert(new_prices)
 
-        # insert prices in collective dictionary
-        times = new_prices.time_slots
-        for time in times:
-            if time in self.price_estimates.keys():
-                pass
-            else:
-                self.price_estimates[time] = prices[times.index(time)]
+        # insert prices in collective price array, prices already known are kept
+        if len(new_prices.time_slots):
+            indexes = self.time_grid.indexes(new_prices.time_slots)
+            self.extend_prices(index_start=int(indexes.min()), index_end=int(indexes.max()) + 1)
+            positions = indexes - self.price_index_first
+            unknown = ~self.price_known[positions]
+            self.price_estimates[positions[unknown]] = new_prices.prices[unknown]
+            self.price_known[positions[unknown]] = True
 
         self.machine.events_listener.on_estimation_added(new_prices.data_id)
 
+    # method to extend the price array to cover slot indexes [index_start, index_end)
+    def extend_prices(self, index_start: int, index_end: int):
+        if not len(self.price_estimates):
+            self.price_index_first = index_start
+        first = min(index_start, self.price_index_first)
+        last = max(index_end, self.price_index_first + len(self.price_estimates))
+        if first == self.price_index_first and last == self.price_index_first + len(self.price_estimates):
+            return
+        # copy known prices into the extended arrays
+        price_estimates = np.zeros(last - first)
+        price_known = np.zeros(last - first, dtype=bool)
+        offset = self.price_index_first - first
+        price_estimates[offset:offset + len(self.price_estimates)] = self.price_estimates
+        price_known[offset:offset + len(self.price_known)] = self.price_known
+        self.price_index_first, self.price_estimates, self.price_known = first, price_estimates, price_known
+
+    # method to release prices of slots before time, so the price array covers the remaining horizon only
+    # the array is copied only once the released slots are more than half of it, amortized O(1) per slot
+    def release_prices_before(self, time: int):
+        num_released = min(self.time_grid.index(time) - self.price_index_first, len(self.price_estimates))
+        if num_released <= 0 or 2 * num_released <= len(self.price_estimates):
+            return
+        self.price_estimates = self.price_estimates[num_released:].copy()
+        self.price_known = self.price_known[num_released:].copy()
+        self.price_index_first += num_released
+
     # method to calculate all schedule-slot costs once information is obtained
     def calculate_all_schedule_energy_costs(self):
         for schedule in list(self.schedules_record.values()):
@@ -69,10 +101,20 @@ class MachineRecordKeeper():
         # use index to get JobDataPoint from jobs_record
         return self.jobs_record.loc[index][Enums.JobRecField.DATA]
 
-    # method to get offer data_response between start and finish time
+    # method to get offer data_response between start and finish time, unknown are 0.0
+    # view into the price array if it covers the interval, otherwise a copy, the price array is not extended
     def get_interval_prices(self, time_start: int, time_finish: int):
-        time_list = CONFIG.create_time_list(time_start=time_start, time_end=time_finish)
-        return self.price_estimates[time_list]
+        index_start = self.time_grid.index(time_start)
+        count = self.time_grid.count(time_start=time_start, time_end=time_finish)
+        position = index_start - self.price_index_first
+        if 0 <= position and position + count <= len(self.price_estimates):
+            return self.price_estimates[position:position + count]
+        prices = np.zeros(count)
+        first = max(position, 0)
+        last = min(position + count, len(self.price_estimates))
+        if first < last:
+            prices[first - position:last - position] = self.price_estimates[first:last]
+        return prices
 
     # method to get prices from records
     def get_job_prices(self, job_id: str) -> EstimationDataPoint:
@@ -80,16 +122,13 @@ class MachineRecordKeeper():
 
     # method to return offer estimate at certain time
     def get_time_price(self, time: int) -> float:
-        try:
-            return self.price_estimates[time]
+        position = self.time_grid.index(time) - self.price_index_first
+        if 0 <= position < len(self.price_estimates) and self.price_known[position]:
+            return float(self.price_estimates[position])
         # if offer does not exist, data_response a new estimate
-        except KeyError:
-            miss_estimate = EstimationDataPoint.create_from_interval(start=max(self.price_estimates.keys()),
-                                                                     finish=time)
-            miss_estimate.my_id = "MissEst" + str(time)
-            # new_event = MachineEvent(my_id=CONFIG.get_time_key(), agent=miss_estimate)
-            # self.employer.events_listener.on_missing_estimation(new_event)
-            return 0.0
+        # new_event = MachineEvent(my_id=CONFIG.get_time_key(), agent=miss_estimate)
+        # self.employer.events_listener.on_missing_estimation(new_event)
+        return 0.0
 
     # method to get job_id energy demand
     def get_job_energy(self, job_id: str):
@@ -108,6 +147,8 @@ class MachineRecordKeeper():
     # method to convert JobDataPoint object to record entry
     @staticmethod
     def job_datapoint_to_record_list(job_datapoint: JobDataPoint):
+        import pandas as pd
+
         my_id = job_datapoint.my_id
         priority = job_datapoint.priority
         status = job_datapoint.status
@@ -116,11 +157,13 @@ class MachineRecordKeeper():
     # calculating job_id cost
     def calculate_job_cost(self, start: int, finish: int, energy_demand: float):
         # calculating the cost of each job_id if it is scheduled as proposed
-        cost = 0
-        for slot in range(int(start), int(finish), CONFIG.TIME_INTERVAL_UNIX):
-            # get offer from record keeper
-            price = self.get_time_price(slot)
-
-            # division / 1000 is subject to units: offer [€ / MWh], energy_demand [kWh / slot]
-            cost += price * energy_demand / 1000
-        return cost
+        # slots of the job as a window of the price array (unknown prices count as 0.0)
+        position_start = self.time_grid.index(start) - self.price_index_first
+        count = len(range(int(start), int(finish), CONFIG.TIME_INTERVAL_UNIX))
+        position_end = min(len(self.price_estimates), position_start + count)
+        position_start = max(0, position_start)
+        price_sum = float(self.price_estimates[position_start:position_end].sum()) if position_end > position_start \
+            else 0.0
+
+        # division / 1000 is subject to units: offer [€ / MWh], energy_demand [kWh / slot]
+        return price_sum * energy_demand / 1000
@@ -1,11 +1,9 @@
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
 from loguru import logger
 
 import CONFIG
 from Enums import JobRecField, JobConstraint
 from DataPoint import KPI
-from SchedulingStrategies import EmpiricalScheduling, PyomoScheduling, RecursiveScheduling
 
 
 class MachineScheduleGenerator:
@@ -16,6 +14,9 @@ class MachineScheduleGenerator:
         self.schedules = []
 
     def generate_schedules(self):
+        # scheduling strategies (incl. the optimization solvers) are imported on first use
+        from SchedulingStrategies import EmpiricalScheduling, PyomoScheduling, RecursiveScheduling
+
         self.jobs = self.create_dictionary()
         self.schedules.append(EmpiricalScheduling.first_in_first_out(self.jobs))
         self.schedules.append(EmpiricalScheduling.earliest_due_date_first(self.jobs))
@@ -66,7 +67,7 @@ class MachineScheduleGenerator:
                               for slot in schedule.table)
         kpi.fraction_on_time = kpi.num_on_time / len(schedule.table)
         kpi.priority_job_pastdue = sum((slot.time_finish > self.jobs[slot.job_id][JobConstraint.TIME_DEADLINE]) *
-                                       (CONFIG.PRIORITY_LEVELS - self.jobs[slot.job_id][JobRecField.PRIORITY])
+                                       (self.machine.config.priority_levels - self.jobs[slot.job_id][JobRecField.PRIORITY])
                                        for slot in schedule.table)
         return kpi
 
@@ -82,6 +83,8 @@ class MachineScheduleGenerator:
     # Gantt Chart largely based on code from
     # https://jckantor.github.io/ND-Pyomo-Cookbook/notebooks/04.02-Machine-Bottleneck.html#example
     def plot_schedules(self):
+        import matplotlib.pyplot as plt
+
         # plt.switch_backend('GTK3Agg')
         plt.switch_backend('Qt5Agg')
         bw = 0.3
@@ -109,6 +109,20 @@ class MachineStrategyBlock:
         # trigger bids-generated event
         self.machine.events_listener.on_bids_generated()
 
+    # method to add a job bid and register its time-slots with the platform clock and its finish with the horizon
+    def add_bid_job(self, job_bid: BidJob):
+        self.bids.append(job_bid)
+        for bid_range in job_bid.bid_ranges:
+            self.machine.platform.clock.add(time_start=bid_range.time_start, count=bid_range.count)
+        self.machine.platform.horizon.add(job_bid.time_finish)
+
+    # method to withdraw a job bid, its time-slots and finish are removed from the platform clock and horizon
+    def remove_bid_job(self, job_bid: BidJob):
+        self.bids.remove(job_bid)
+        for bid_range in job_bid.bid_ranges:
+            self.machine.platform.clock.remove(time_start=bid_range.time_start, count=bid_range.count)
+        self.machine.platform.horizon.remove(job_bid.time_finish)
+
     # method to set employer objectives
     def add_objectives(self, objectives):
         self.objectives.append(objectives)
@@ -170,8 +184,8 @@ class MachineStrategyBlock:
     # function to callback when bid returns
     def set_bid_feedback(self, bid_fb: BidFeedback):
         for job_bid in self.bids:
-            for bid in job_bid.bids:
-                if bid_fb is job_bid.bids:
+            for bid in job_bid.bids.values():
+                if bid_fb is bid:
                     bid.see_market_results(bid_fb)
 
     # method to get bid at certain time
@@ -193,7 +207,7 @@ class MachineStrategyBlock:
 
     # function to calculate priority factor based on PriorityProfile
     def priority_factor(self, priority: int) -> float:
-        arithmatic_priority = CONFIG.PRIORITY_LEVELS - priority
+        arithmatic_priority = self.machine.config.priority_levels - priority
         factor = 1.0
 
         if ObjectiveEval.PRIORITY_EXPONENTIAL in self.evaluation_profile:
@@ -254,11 +268,13 @@ class StrategyBiddingNominal(StrategyBidding):
                 self.counter_bid_job += 1
                 # create Job Bid
                 job_bid = BidJob(my_id=self.strategizer.machine.my_id + schedule.source.value + CONFIG.NAME_BID_JOB +
-                                       str(self.counter_bid_job).zfill(CONFIG.NAME_ZERO_FILL),
+                                       str(self.counter_bid_job).zfill(self.strategizer.machine.config.name_zero_fill),
                                  job_id=slot.job_id,
                                  priority=self.strategizer.records.get_job(slot.job_id).priority,
                                  bid_priority=bid_priority, source_entity=self.strategizer.machine.my_id,
-                                 source_strategy=self.my_id, source_schedule=schedule.source)
+                                 source_strategy=self.my_id, source_schedule=schedule.source,
+                                 time_grid=self.strategizer.machine.config.time_grid,
+                                 name_zero_fill=self.strategizer.machine.config.name_zero_fill)
                 job_bid.bids_from_schedule_slot(slot=slot, markup=self.markup)
                 # log bid generation for job
                 logger.info(self.strategizer.machine.my_id + ": " + f"{self.my_id} bid for job {slot.job_id} generated,"
@@ -268,7 +284,7 @@ class StrategyBiddingNominal(StrategyBidding):
                 self.bids.append(job_bid)
 
                 # export bids to the employer strategy block
-                self.strategizer.bids.append(job_bid)
+                self.strategizer.add_bid_job(job_bid)
 
             # iterate bid priority so next bidding schedule is of lower priority
             bid_priority += 1
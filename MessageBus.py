@@ -0,0 +1,93 @@
+# Message bus of the platform
+# sending a message only enqueues it, a dispatcher drains the queue and calls the listeners one message at a time,
+# so every hop of an agent starts from the dispatcher and the stack depth stays the same however long a chain is.
+# The interface follows pypubsub (subscribe / sendMessage) so entities publish and subscribe the same way as before.
+import asyncio
+from collections import deque
+
+from loguru import logger
+
+
+class MessageBus:
+    def __init__(self, batch_size: int = 1000):
+        # topic name -> listeners, in order of subscription
+        self.listeners = {}
+        # pending messages as (function, keyword arguments)
+        self.messages = deque()
+        # number of messages dispatched before yielding to the event loop
+        self.batch_size = batch_size
+        self.is_dispatching = False
+        # functions called after every dispatched message, e.g. to check a deadline while the queue is busy
+        self.watchers = []
+
+        # statistics
+        self.num_sent = 0
+        self.num_dispatched = 0
+        self.max_pending = 0
+
+    # subscribe a listener to a topic, a listener is subscribed only once per topic
+    def subscribe(self, listener, topicName: str):
+        listeners = self.listeners.setdefault(topicName, [])
+        if listener not in listeners:
+            listeners.append(listener)
+
+    def unsubscribe(self, listener, topicName: str):
+        listeners = self.listeners.get(topicName, [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    # publish a message on a topic, every listener of the topic is called when the message is dispatched
+    def sendMessage(self, topicName: str, **kwargs):
+        listeners = self.listeners.get(topicName)
+        if not listeners:
+            logger.info(f"MessageBus: no listeners for topic {topicName}")
+            return
+        for listener in listeners:
+            self.post(listener, **kwargs)
+
+    # call function after every dispatched message, it runs on the hot path and must be cheap
+    def watch(self, function):
+        if function not in self.watchers:
+            self.watchers.append(function)
+
+    # enqueue a call of function with keyword arguments
+    def post(self, function, **kwargs):
+        self.messages.append((function, kwargs))
+        self.num_sent += 1
+        if len(self.messages) > self.max_pending:
+            self.max_pending = len(self.messages)
+
+    # dispatch pending messages (and the messages they send) until the queue is empty or max_messages are dispatched
+    # returns the number of dispatched messages, calls from inside a listener return immediately
+    def dispatch(self, max_messages: int = None) -> int:
+        if self.is_dispatching:
+            return 0
+        self.is_dispatching = True
+        num_dispatched = 0
+        try:
+            while self.messages and (max_messages is None or num_dispatched < max_messages):
+                function, kwargs = self.messages.popleft()
+                function(**kwargs)
+                num_dispatched += 1
+                for watcher in self.watchers:
+                    watcher()
+        finally:
+            self.is_dispatching = False
+            self.num_dispatched += num_dispatched
+        return num_dispatched
+
+    # dispatch from the event loop until no message is pending, yielding to other tasks between batches
+    async def run_until_idle(self) -> int:
+        num_dispatched = 0
+        while self.messages:
+            num_dispatched += self.dispatch(max_messages=self.batch_size)
+            await asyncio.sleep(0)
+        return num_dispatched
+
+    @property
+    def is_idle(self) -> bool:
+        return not self.messages
+
+    def __str__(self):
+        return f"{len(self.messages)} pending, sent: {self.num_sent}, dispatched: {self.num_dispatched}, " \
+               f"max pending: {self.max_pending}"
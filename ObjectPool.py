@@ -0,0 +1,40 @@
+# Pool of reusable objects
+# released objects are reset in place and handed out again instead of allocating new ones,
+# counters show how many objects were allocated and how many requests were served from the pool
+class ObjectPool:
+    def __init__(self, factory: callable, reset: callable = None, max_size: int = None):
+        self.factory = factory  # creates a new object when the pool is empty
+        self.reset = reset  # resets a released object in place
+        self.max_size = max_size  # number of free objects kept, None keeps all
+        self.objects = []
+
+        # statistics
+        self.num_allocated = 0
+        self.num_reused = 0
+        self.num_released = 0
+        self.num_dropped = 0
+
+    # get a free object, allocated only if the pool is empty
+    def acquire(self):
+        if self.objects:
+            self.num_reused += 1
+            return self.objects.pop()
+        self.num_allocated += 1
+        return self.factory()
+
+    # return an object to the pool, dropped if the pool is full
+    def release(self, item):
+        self.num_released += 1
+        if self.max_size is not None and len(self.objects) >= self.max_size:
+            self.num_dropped += 1
+            return
+        if self.reset is not None:
+            self.reset(item)
+        self.objects.append(item)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __str__(self):
+        return f"{len(self.objects)} free, allocated: {self.num_allocated}, reused: {self.num_reused}, " \
+               f"released: {self.num_released}, dropped: {self.num_dropped}"
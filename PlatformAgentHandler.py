@@ -1,29 +1,58 @@
-import pubsub.pub
+import time
+from dataclasses import dataclass
+
 from loguru import logger
-from pubsub import pub
 
 import CONFIG
 from Agent import Agent
 from DataPoint import DataPoint, Request
+from ObjectPool import ObjectPool
 from PlatformQueue import PlatformQueue
 from PlatfromHashTable import PlatformHashTable
 import TradingPlatform
 
 
+# sizing decision of the elastic agent pool
+@dataclass
+class SizingDecision:
+    time: float  # perf_counter time of the decision
+    action: str  # "grow" or "shrink"
+    num_agents: int  # pool size after the decision
+    num_requests_waiting: int
+    time_waiting: float  # seconds since the pool ran out of agents
+
+
 class PlatformAgentHandler:
     def __init__(self, platform: TradingPlatform):
         # reference to platform
         self.platform = platform
+        config = platform.config
+
+        # pool size limits, the pool grows on demand and shrinks when idle
+        self.num_agents_min = config.n_agents_min if config.agents_elastic else config.n_agents
+        self.num_agents_max = config.n_agents
+        self.num_agents = 0  # agents in the pool, deployed or not
+        self.num_agents_created = 0  # used for naming agents
+        # time the pool ran out of agents, None while agents are free
+        self.time_exhausted: float = None
+        # time the pool last grew, the pool does not shrink within the shrink wait after growing
+        self.time_grown = 0.0
+        self.sizing_log: [SizingDecision] = []
+
+        # retired agents, taken back before new agents are created when the pool grows
+        self.agents_retired = ObjectPool(factory=self.create_agent, reset=Agent.reset_assignment)
 
         # agents queue
         self.agents_queue = PlatformQueue()
-        self.generate_agents()
+        self.generate_agents(count=self.num_agents_min)
 
         # Hashtable for tracking relevant CC
         self.shadow_agent_cc = PlatformHashTable()
 
     # function to be called be CC to reserve an agent
     def reserve_agent(self):
+        if self.agents_queue.is_empty():
+            self.grow()
         if self.agents_queue.is_empty():
             agent = None
             logger.info("Platform: All agents deployed, No more can be reserved!")
@@ -31,32 +60,78 @@ class PlatformAgentHandler:
             # deploy agent
             agent = self.agents_queue.get()
             logger.info(f"Platform: Agent {agent.my_id} deployed, "
-                        f"{self.agents_queue.size()} / {CONFIG.N_AGENTS} remain")
+                        f"{self.agents_queue.size()} / {self.num_agents} remain")
         return agent
 
     def terminate_transaction(self, agent:Agent):
         """"Terminate transaction by agent reset  returning it to the agents_queue"""""
         # log transaction termination
         logger.info(f"Platform: transaction {agent.transaction_id} terminated")
-        # create a fresh agent with same name
-        reset_agent = Agent(my_id=agent.my_id)
-        reset_agent.platform = self.platform
-        # delete old agent
-        del agent
-        # put fresh agent in queue
-        self.agents_queue.put(reset_agent)
+        # retire agent if the pool is idle, otherwise reset agent in place and put it back in queue
+        if self.shrink():
+            self.agents_retired.release(agent)
+        else:
+            agent.reset_assignment()
+            self.agents_queue.put(agent)
+        # the pool stops being exhausted only if the agent stays free, a waiting request takes it right away
+        if not self.num_requests_waiting():
+            self.time_exhausted = None
         # trigger the CCs to check their queue requests now that an agent is free
-        pub.sendMessage(CONFIG.TOPIC_CC_CHECK_REQUESTS_QUEUE)
+        self.platform.bus.sendMessage(CONFIG.TOPIC_CC_CHECK_REQUESTS_QUEUE)
+
+    # method to add agents when requests queue up behind an empty pool, returns number of agents added
+    def grow(self) -> int:
+        time_current = time.perf_counter()
+        if self.time_exhausted is None:
+            self.time_exhausted = time_current
+        num_requests = self.num_requests_waiting()
+        time_waiting = time_current - self.time_exhausted
+        if self.num_agents >= self.num_agents_max or (num_requests < self.platform.config.agents_grow_depth
+                                                      and time_waiting < self.platform.config.agents_grow_wait):
+            return 0
+        count = min(num_requests, self.num_agents_max - self.num_agents)
+        self.generate_agents(count=count)
+        self.time_grown = time_current
+        self.log_sizing(action="grow", num_requests=num_requests, time_waiting=time_waiting)
+        return count
+
+    # method to check if a returning agent can be retired: no request waits, more than half of the pool is idle and
+    # the pool did not grow within the shrink wait
+    def shrink(self) -> bool:
+        if self.num_agents <= self.num_agents_min or self.num_requests_waiting() or \
+                self.agents_queue.size() < self.num_agents // 2 or \
+                time.perf_counter() - self.time_grown < self.platform.config.agents_shrink_wait:
+            return False
+        self.num_agents -= 1
+        self.log_sizing(action="shrink", num_requests=0, time_waiting=0.0)
+        return True
+
+    # method to count agent requests queued at the communication controllers
+    def num_requests_waiting(self) -> int:
+        return sum(queue.size() for cc in (self.platform.fcc, self.platform.bcc)
+                   for queue in (cc.machine_requests_queue, cc.service_requests_queue))
+
+    def log_sizing(self, action: str, num_requests: int, time_waiting: float):
+        self.sizing_log.append(SizingDecision(time=time.perf_counter(), action=action, num_agents=self.num_agents,
+                                              num_requests_waiting=num_requests, time_waiting=time_waiting))
+        logger.info(f"Platform: agent pool {action} to {self.num_agents} agents, "
+                    f"{num_requests} requests waiting for {time_waiting * 1000:.1f}ms")
 
     # Helper Methods
 
-    # method for agents generation
-    def generate_agents(self):
-        for i in range(1, CONFIG.N_AGENTS):
-            # Generate Agent ID
-            agent_name = CONFIG.NAME_AGENT + str(i).zfill(CONFIG.NAME_ZERO_FILL)
-            # Create Agent instance
-            new_agent = Agent(my_id=agent_name)
-            new_agent.platform = self.platform
+    # method for agents generation, retired agents are reused before new ones are created
+    def generate_agents(self, count: int):
+        for _ in range(count):
             # Save Agent in Queue
-            self.agents_queue.put(new_agent)
+            self.agents_queue.put(self.agents_retired.acquire())
+        self.num_agents += count
+
+    # method to create a new agent
+    def create_agent(self) -> Agent:
+        self.num_agents_created += 1
+        # Generate Agent ID
+        agent_name = CONFIG.NAME_AGENT + str(self.num_agents_created).zfill(self.platform.config.name_zero_fill)
+        # Create Agent instance
+        new_agent = Agent(my_id=agent_name)
+        new_agent.platform = self.platform
+        return new_agent
@@ -1,21 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from typing import TYPE_CHECKING
 import numpy as np
-import pandas as pd
-import pymarket as pm
-from pandas import DataFrame
 from loguru import logger
-from pubsub import pub
 
 import CONFIG
 import TradingPlatform
-from Agent import Drone
+from Agent import Agent, Drone
 from CC import BCC
 from DataPoint import BidFeedback
 from Enums import CommField, MarketRole, BidStatus
 from PlatformEntity import Service
 
+if TYPE_CHECKING:
+    import pymarket as pm
+
 
 # Enum to represent the market type used
 class MarketType(Enum):
@@ -39,6 +41,15 @@ class PlatformBiddingModule(Service):
         self.markets: dict = {}
         self.topic = CONFIG.TOPIC_MARKET
 
+        # slots skipped by the platform clock as (time_start, count), no round is run for them
+        self.slots_no_trade = []
+        self.num_slots_no_trade = 0
+
+        # pipelined rounds: executor clearing the markets and futures of the rounds being cleared
+        self.executor: ThreadPoolExecutor = None
+        self.rounds_clearing = set()
+        self.num_rounds_waiting = 0  # collected rounds whose next round opens once the round before is cleared
+
         # user id that is unique for every bid source
         self._user_id = 1
         self.user_dict = {}
@@ -46,73 +57,118 @@ class PlatformBiddingModule(Service):
     # execute service for each service_to_start
     def on_new_request(self):
         logger.info(self.my_id + f": bid received for time: {self.platform.time_running}")
-        self.platform.market_bid_received()  # num=self.services_to_start.size())
+
+    # function to handle incoming bids, bids for a round that is not open anymore are rejected right away
+    def handle_agent_returned(self, agent: Agent):
+        source_id = agent.source_id
+        if self.platform.barrier.is_open_for(time_slot=agent.data_to_find[CommField.TIME_SLOT]):
+            Service.handle_agent_returned(self, agent=agent)
+            self.platform.barrier.arrive(party=source_id)
+            return
+        # create drone and copy agent
+        late_drone = self.drones_pool.acquire()
+        late_drone.my_id = self.service_id
+        late_drone.copy_agent(agent=agent)
+        agent.terminate()
+        logger.info(self.my_id + f": late bid {late_drone.data_id} from {source_id} rejected, "
+                                 f"round {late_drone.data_to_find[CommField.TIME_SLOT]} closed")
+        late_drone.data_response = BidFeedback(bid_id=late_drone.data_id, source_id=source_id,
+                                               slot=late_drone.data_to_find[CommField.TIME_SLOT],
+                                               feedback=BidStatus.REJECTED)
+        self.services_completed.put(late_drone)
+        self.on_service_completed()
 
     # method to trigger bidding round
     def start_bidding_round(self):
+        time_round = self.platform.time_running
+        market, bid_drones, users = self.collect_bids(time_round=time_round)
+        # pipelined: open next round right away and clear this one in the background, needs a running event loop
+        if self.platform.config.pipeline_rounds:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                # collection runs at most one round ahead: the next round opens now if no other round is clearing,
+                # otherwise once the round before is cleared
+                is_round_ahead = bool(self.rounds_clearing)
+                if self.executor is None:
+                    # one clearing at a time, so results are delivered in the order of the rounds
+                    self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.my_id)
+                future = loop.run_in_executor(self.executor, self.clear_market, market, time_round)
+                self.rounds_clearing.add(future)
+                future.add_done_callback(lambda cleared: self.on_round_cleared(
+                    cleared=cleared, market=market, bid_drones=bid_drones, users=users))
+                if is_round_ahead:
+                    self.num_rounds_waiting += 1
+                else:
+                    # signal to platform that bids of this round are collected
+                    self.platform.bidding_round_end()
+                return
+        self.clear_market(market=market, time_round=time_round)
+        self.deliver_results(market=market, bid_drones=bid_drones, users=users)
+        # signal to platform that round ended
+        self.platform.bidding_round_end()
+
+    # called in the event loop when a round is cleared: deliver results and open a round waiting for the clearing
+    def on_round_cleared(self, cleared: asyncio.Future, market: pm.Market, bid_drones: list, users: dict):
+        self.rounds_clearing.discard(cleared)
+        self.platform.bus.post(self.deliver_results, market=market, bid_drones=bid_drones, users=users,
+                               cleared=cleared)
+        if self.num_rounds_waiting:
+            self.num_rounds_waiting -= 1
+            self.platform.bus.post(self.platform.bidding_round_end)
+
+    # stage 1: move bids of the round into a new market, returns market, bid drones and their market users
+    def collect_bids(self, time_round: int):
+        # pymarket (and pandas) are imported on the first market round, not on platform startup
+        import pymarket as pm
+
         # create market module
         market = pm.Market()
-        self.markets[self.platform.time_running] = market
+        self.markets[time_round] = market
 
-        #
-        while not self.services_to_start.is_empty():
-            # get data_drone from to-start queue
-            bid_drone = self.services_to_start.get()
+        # get data_drones from to-start queue
+        bid_drones = self.services_to_start.drain()
+        for bid_drone in bid_drones:
             # put agent drone in in-progress table
             self.services_in_progress.insert(bid_drone)
             # add new bid to market_round
             self.add_bid(market=market, bid_drone=bid_drone)
+        # users of this round, the next round starts with an empty user dictionary
+        users, self.user_dict = self.user_dict, {}
+        return market, bid_drones, users
 
-        pass
-        # execute market
+    # stage 2: execute market, touches only the market of the round so it can run outside the dispatcher
+    @staticmethod
+    def clear_market(market: pm.Market, time_round: int):
         transactions, _ = market.run(MarketType.P2P.value)  # , np.random.RandomState(1234))
         # log market
         if transactions.get_df().empty:
             # log no trading
-            logger.info(f"Market: No trade, time {self.platform.time_running}")
+            logger.info(f"Market: No trade, time {time_round}")
         else:
             # log trading
-            logger.info(f"Market: Trade, time {self.platform.time_running}")
-        # extract results to send back
-        self.extract_results(market=market)
-        # save market
-        self.markets[self.platform.time_running] = market
-        # purge user dictionary to avoid getting too large
-        self.user_dict.clear()
-        # send agents with results
+            logger.info(f"Market: Trade, time {time_round}")
+
+    # stage 3: extract results and send agents with results back
+    def deliver_results(self, market: pm.Market, bid_drones: list, users: dict, cleared: asyncio.Future = None):
+        # raise errors of a clearing run outside the dispatcher
+        if cleared is not None:
+            cleared.result()
+        self.extract_results(market=market, bid_drones=bid_drones, users=users)
         self.on_service_completed()
-        # signal to platform that round ended
-        self.platform.bidding_round_end()
-        pass
 
-    def extract_results(self, market: pm.Market):
-        # get market results
-        output = market.transactions.get_df()
-        # rekey agent to use source for easier access
-        output.set_index(keys=output['source'], inplace=True)
+    def extract_results(self, market: pm.Market, bid_drones: list, users: dict):
+        output = self.get_transactions(market=market)
         details = []  # list to store information if bid was split
         # set response agent for each drone
-        for drone in self.services_in_progress.values():
+        for drone in bid_drones:
             # check if result is empty due to no transactions
             if output.empty:
                 feedback = BidStatus.NO_TAKERS
             else:
-                # extract agent entry related to drone
-                result = output['active'].get(key=self.user_dict[drone.data_id])
-                # check if feedback is a panda Series instead of simple boolean
-                if pd.Series is type(result):
-                    # extract all entries related and parse
-                    result_data = self.parse_bid_result(output[['quantity', 'active']]
-                                                        .loc[self.user_dict[drone.data_id]])
-                    # save details as a list of tuples
-                    details = [tuple(entry) for entry in result_data.to_numpy()]
-                    # if any of the bid splits where accepted, then feedback is ACCEPTED
-                    if any(entry is BidStatus.ACCEPTED for entry in [result_data['active'].to_numpy()]):
-                        feedback = BidStatus.ACCEPTED
-                    else:
-                        feedback = BidStatus.REJECTED
-                else:
-                    feedback = self.parse_bid_result(result)
+                feedback, details = self.get_user_feedback(output=output, user=users[drone.data_id])
                 # create BidFeedback object for agent response
             response_data = BidFeedback(my_id=drone.data_id, source_id=drone.source_id,
                                         slot=drone.data_to_find[CommField.TIME_SLOT],
@@ -121,12 +177,74 @@ class PlatformBiddingModule(Service):
             self.services_in_progress.remove(drone.my_id)
             self.services_completed.put(drone)
 
+    # method to record slots without bids from time_start up to time_end (exclusive) as rounds without trade
+    def record_no_trade(self, time_start: int, time_end: int):
+        count = self.platform.config.time_grid.count(time_start=time_start, time_end=time_end)
+        if count:
+            self.slots_no_trade.append((time_start, count))
+            self.num_slots_no_trade += count
+            logger.info(f"Market: No trade, {count} time-slots without bids from time {time_start}")
+
+    # method to get market results, keyed by market user
+    @staticmethod
+    def get_transactions(market: pm.Market):
+        output = market.transactions.get_df()
+        # rekey agent to use source for easier access
+        output.set_index(keys=output['source'], inplace=True)
+        return output
+
+    # method to get feedback of a market user from a non-empty market result, with details if the bid was split
+    def get_user_feedback(self, output, user: int):
+        import pandas as pd
+
+        details = []
+        # extract agent entry related to user
+        result = output['active'].get(key=user)
+        # check if feedback is a panda Series instead of simple boolean
+        if pd.Series is type(result):
+            # extract all entries related and parse
+            result_data = self.parse_bid_result(output[['quantity', 'active']].loc[user])
+            # save details as a list of tuples
+            details = [tuple(entry) for entry in result_data.to_numpy()]
+            # if any of the bid splits where accepted, then feedback is ACCEPTED
+            if any(entry is BidStatus.ACCEPTED for entry in [result_data['active'].to_numpy()]):
+                feedback = BidStatus.ACCEPTED
+            else:
+                feedback = BidStatus.REJECTED
+        else:
+            feedback = self.parse_bid_result(result)
+        return feedback, details
+
+    # method to clear a market round of compact bids (bid_id, energy, price, role value) without any agents,
+    # used by the coordinator of the sharded platform, returns the feedback of every bid keyed by bid_id
+    def clear_bids(self, bids: list) -> dict:
+        import pymarket as pm
+
+        if not bids:
+            return {}
+        market = pm.Market()
+        for bid_id, energy, price, role in bids:
+            self.add_bid_values(market=market, bid_id=bid_id, quantity=energy, price=price, role=role)
+        market.run(MarketType.P2P.value)
+        output = self.get_transactions(market=market)
+        if output.empty:
+            feedback = dict.fromkeys((bid[0] for bid in bids), BidStatus.NO_TAKERS)
+        else:
+            feedback = {bid_id: self.get_user_feedback(output=output, user=self.user_dict[bid_id])[0]
+                        for bid_id, _, _, _ in bids}
+        # purge user dictionary to avoid getting too large
+        self.user_dict.clear()
+        return feedback
+
     def add_bid(self, market: pm.Market, bid_drone: Drone):
         # extract agent from drone to create bid
-        user_str = bid_drone.data_to_find[CommField.BID_ID]
-        quantity = bid_drone.data_to_find[CommField.ENERGY]
-        price = bid_drone.data_to_find[CommField.PRICE_OFFER]
-        role = bid_drone.data_to_find[CommField.MARKET_ROLE].value
+        self.add_bid_values(market=market, bid_id=bid_drone.data_to_find[CommField.BID_ID],
+                            quantity=bid_drone.data_to_find[CommField.ENERGY],
+                            price=bid_drone.data_to_find[CommField.PRICE_OFFER],
+                            role=bid_drone.data_to_find[CommField.MARKET_ROLE].value)
+
+    def add_bid_values(self, market: pm.Market, bid_id: str, quantity: float, price: float, role: bool):
+        user_str = bid_id
         time = 0
         if role is MarketRole.BUYER:
             divisible = False
@@ -145,6 +263,8 @@ class PlatformBiddingModule(Service):
     def parse_bid_result(data):
         """" function to parse transaction result
              if transaction 'active' is true then bid was rejected and vice, versa """""
+        import pandas as pd
+
         parsed_data = data
         # if agent is a pandas DataFrame parse each entry
         if isinstance(data, pd.DataFrame):
@@ -159,4 +279,4 @@ class PlatformBiddingModule(Service):
         return self._user_id
 
     def register_in_platform(self):
-        pub.subscribe(self.receive_agent, topicName=self.topic)
+        self.platform.register_route(entity_id=self.my_id, receive_agent=self.receive_agent)
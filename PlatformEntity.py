@@ -2,9 +2,9 @@
 from abc import abstractmethod
 
 from loguru import logger
-from pubsub import pub
 
 from Agent import Agent, Drone
+from ObjectPool import ObjectPool
 import CONFIG
 from CC import CC
 from DataPoint import Request
@@ -66,28 +66,32 @@ class Service(PlatformEntity):
         self.logging_key_word = ""
 
         # queues for tracking service stages
-        self.services_completed = PlatformQueue()
+        self.services_completed = PlatformQueue(max_size=platform.config.queue_max_size or None)
         self.services_in_progress = PlatformHashTable()
-        self.services_to_start = PlatformQueue()
+        self.services_to_start = PlatformQueue(max_size=platform.config.queue_max_size or None)
+        self.is_start_scheduled = False
 
         # table of agent-agent requests
         self.requests_table = PlatformHashTable()
 
+        # drones are reused once their response is handed to an agent, at most one free drone per agent is kept
+        self.drones_pool = ObjectPool(factory=lambda: Drone(my_id=""), reset=Drone.reset_assignment,
+                                      max_size=platform.config.n_agents)
+
     # method for action triggered every new agent added
     @abstractmethod
     def on_new_request(self):
         raise NotImplementedError
 
-    # request agent for each completed service
+    # request agent for each completed service, all requests are submitted to the CC at once
     def on_service_completed(self):
-        # while there is still completed services, submit agent requests
-        while not self.services_completed.is_empty():
-            # get agent from completed_services queue
-            data = self.services_completed.get()
+        agent_requests = []
+        # get all agents from completed_services queue
+        for data in self.services_completed.drain():
             # create a new response agent
             current_request_id = self.request_id
             agent_request = Request(request_id=current_request_id, source_id=self.my_id, destination_id=data.source_id,
-                                    data_id=data.data_id, priority=data.priority)
+                                    data_id=data.data_id, priority=data.priority, deadline=data.deadline)
 
             # save agent until agent is granted
             data.my_id = current_request_id
@@ -96,27 +100,41 @@ class Service(PlatformEntity):
             # logging
             logger.info(self.my_id + ' ' + f'service {self.logging_key_word}: {data.data_id} completed')
 
-            # request agent from FCC
-            self.cc.request_agent(request=agent_request)
-            # pub.sendMessage(topicName=self.cc.topic, request=agent_request)
+            agent_requests.append(agent_request)
+
+        # request agents from CC
+        if agent_requests:
+            self.cc.request_agents(requests=agent_requests)
 
     # function to handle incoming agents and trigger service
     def handle_agent_returned(self, agent: Agent):
         # create drone and copy agent
-        service_drone = Drone(my_id=self.service_id)
+        service_drone = self.drones_pool.acquire()
+        service_drone.my_id = self.service_id
         service_drone.copy_agent(agent=agent)
 
+        # logging
+        logger.info(self.my_id + ' ' + f'{self.cc.my_id} service {self.logging_key_word}'
+                                       f'transaction {agent.transaction_id} agent received')
+
         # terminate agent
         agent.terminate()
 
         # save service agent in a queue
         self.services_to_start.put(item=service_drone)
 
-        # logging
-        logger.info(self.my_id + ' ' + f'{self.cc.my_id} service {self.logging_key_word}'
-                                       f'transaction {agent.transaction_id} agent received')
-
         # trigger service start
+        self.schedule_start()
+
+    # post a start of the queued services unless one is pending already, so agents that arrive in the same
+    # dispatch batch are started together
+    def schedule_start(self):
+        if not self.is_start_scheduled:
+            self.is_start_scheduled = True
+            self.platform.bus.post(self.start_services)
+
+    def start_services(self):
+        self.is_start_scheduled = False
         self.on_new_request()
 
     def handle_agent_granted(self, agent: Agent):
@@ -124,6 +142,8 @@ class Service(PlatformEntity):
         data_drone = self.requests_table.remove(agent.request_id)
         # set agent data as data_drone
         agent.data_from_drone(data_drone)
+        # drone is not needed anymore
+        self.drones_pool.release(data_drone)
         # send agents to destination
         agent.to_destination()
 
@@ -1,35 +1,70 @@
 # Queue class implementation
-from queue import Queue
-from asyncio import PriorityQueue
+# binary heap of (sort key, sequence, item) entries: the sequence number keeps items of equal key in arrival order, so
+# the order is deterministic and items are never compared. Datapoints are sorted by their priority unless a key
+# function is given. Capacity is unbounded unless max_size is given, putting into a full queue raises QueueFull.
+# Queues are consumed by drains posted on the platform bus, so there is no waiting get.
+import asyncio
+from heapq import heapify, heappop, heappush
+from itertools import count
 
 import CONFIG
-from DataPoint import Request
+from DataPoint import DataPoint
 
 
 class PlatformQueue():
-    def __init__(self, max_size=CONFIG.N_INITIAL_CAPACITY):
-        self.queue = PriorityQueue(max_size)
+    def __init__(self, max_size: int = None, key: callable = None):
+        self.heap = []
+        self.max_size = max_size
+        # function giving the sort key of an item
+        self.key = key
+        self.sequence = count()
+
+    def sort_key(self, item):
+        if self.key is not None:
+            return self.key(item)
+        if isinstance(item, DataPoint):
+            return item.priority
+        return CONFIG.PRIORITY_DEFAULT
 
     def put(self, item):
-        if isinstance(item, Request):
-            priority = item.priority
-        else:
-            priority = CONFIG.PRIORITY_DEFAULT
+        if self.is_full():
+            raise asyncio.QueueFull
+        heappush(self.heap, (self.sort_key(item), next(self.sequence), item))
 
-        self.queue.put_nowait((priority, item))
+    # put several items at once, the heap is rebuilt if the batch is larger than the queue
+    def put_many(self, items: list):
+        if self.max_size is not None and self.size() + len(items) > self.max_size:
+            raise asyncio.QueueFull
+        entries = [(self.sort_key(item), next(self.sequence), item) for item in items]
+        if len(entries) > len(self.heap):
+            self.heap.extend(entries)
+            heapify(self.heap)
+        else:
+            for entry in entries:
+                heappush(self.heap, entry)
 
-    def put_priority_highest(self, item):
-        self.queue.put_nowait((0, item))
+    # first item without removing it, None if the queue is empty
+    def peek(self):
+        return self.heap[0][2] if self.heap else None
 
     def get(self):
-        data = self.queue.get_nowait()[1]
-        return data
+        if not self.heap:
+            raise asyncio.QueueEmpty
+        return heappop(self.heap)[2]
+
+    # remove and return up to max_items items (all if None) in queue order
+    def drain(self, max_items: int = None) -> list:
+        num_items = self.size() if max_items is None else min(max_items, self.size())
+        return [self.get() for _ in range(num_items)]
 
     def size(self):
-        return self.queue.qsize()
+        return len(self.heap)
 
     def is_empty(self):
-        return self.queue.empty()
+        return not self.heap
 
     def is_full(self):
-        return self.queue.full()
+        return self.max_size is not None and self.size() >= self.max_size
+
+    def __len__(self):
+        return self.size()
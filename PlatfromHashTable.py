@@ -113,27 +113,24 @@ class HashTable:
 
 
 # Generic class for all data_response tables in employer
+# datapoints are kept in a dict keyed by my_id, so insert and remove are O(1) and iteration follows insertion order.
+# keys(), values() and items() are live read-only views, copy them with list() before changing the table while
+# iterating.
 class PlatformHashTable():
-    def __init__(self, init_buckets: int =CONFIG.N_INITIAL_CAPACITY):
-        # HashTable.__init__(self, init_buckets)
+    def __init__(self, init_buckets: int = CONFIG.N_INITIAL_CAPACITY):
         self.hash_table: dict = {}
-        self.keys_list = []
 
     def __str__(self):
-        # for i in list:
-        #     print(list[i])
-        for i in self.keys_list:
-            print(self.keys_list[i])
+        return "\n".join(str(datapoint) for datapoint in self.hash_table.values())
 
-    def insert(self, datapoint):
-        # create new key using current time
-        # key = get_time_key() + datapoint.get_id()
-        key = datapoint.my_id
+    def __len__(self):
+        return len(self.hash_table)
 
-        self.keys_list.append(key)
+    def __contains__(self, key):
+        return key in self.hash_table
 
-        # insert the datapoint using the new key
-        # HashTable.insert(self, key=key, value=datapoint)
+    def insert(self, datapoint):
+        key = datapoint.my_id
         self.hash_table[key] = datapoint
 
         # return generated key
@@ -143,12 +140,13 @@ class PlatformHashTable():
         return self.hash_table[key]
 
     def remove(self, key):
-        self.keys_list.remove(key)
-        # return HashTable.remove(self, key)
         return self.hash_table.pop(key)
 
     def keys(self):
-        return list(self.hash_table.keys())
+        return self.hash_table.keys()
 
     def values(self):
-        return list(self.hash_table.values())
\ No newline at end of file
+        return self.hash_table.values()
+
+    def items(self):
+        return self.hash_table.items()
@@ -0,0 +1,57 @@
+# Persistent cache of price week blocks
+# one .npy file per (filter, region, resolution, week), holding a (2, n) array of timestamps [s] and values,
+# loaded memory-mapped so repeated runs read prices at disk speed without any network request
+from __future__ import annotations
+
+import os
+import time
+
+import numpy as np
+
+
+class PriceDiskCache:
+    def __init__(self, path: str, fixtures_path: str = None, offline: bool = False):
+        self.path = path
+        # read-only directory with the same file layout, e.g. checked-in prices for machines without network
+        self.fixtures_path = fixtures_path
+        # in offline mode, blocks are served only from the cache or the fixtures
+        self.offline = offline
+
+    # create cache from the options of a simulation configuration
+    @staticmethod
+    def from_config(config) -> PriceDiskCache:
+        return PriceDiskCache(path=config.price_cache, fixtures_path=config.price_fixtures, offline=config.offline)
+
+    @staticmethod
+    def file_name(filter_var: int, region: str, resolution: str, weekly_timestamp: int) -> str:
+        return f"{filter_var}_{region}_{resolution}_{weekly_timestamp}.npy"
+
+    # load a week block as (timestamps, values) arrays, None if the block is neither cached nor a fixture
+    def load(self, filter_var: int, region: str, resolution: str, weekly_timestamp: int):
+        name = self.file_name(filter_var, region, resolution, weekly_timestamp)
+        for directory in (self.path, self.fixtures_path):
+            if directory is None:
+                continue
+            file_path = os.path.join(directory, name)
+            if os.path.isfile(file_path):
+                block = np.load(file_path, mmap_mode='r')
+                return block[0].astype(np.int64), block[1]
+        return None
+
+    # store a week block, written to a temporary file first so readers never see a partial block
+    def store(self, filter_var: int, region: str, resolution: str, weekly_timestamp: int,
+              timestamps: np.ndarray, values: np.ndarray):
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        file_path = os.path.join(self.path, self.file_name(filter_var, region, resolution, weekly_timestamp))
+        file_path_temp = file_path + f".{os.getpid()}.tmp"
+        with open(file_path_temp, 'wb') as file:
+            np.save(file, np.vstack([np.asarray(timestamps, dtype=np.float64), np.asarray(values, dtype=np.float64)]))
+        os.replace(file_path_temp, file_path)
+
+    # check if a week block is closed, i.e. its values cannot change anymore and it can be stored permanently
+    @staticmethod
+    def is_week_closed(weekly_timestamp: int) -> bool:
+        # one extra hour covers weeks with a daylight-saving transition
+        return (weekly_timestamp / 1000) + (7 * 24 + 1) * 3600 <= time.time()
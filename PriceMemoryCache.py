@@ -0,0 +1,84 @@
+# In-memory cache of price week blocks with a byte budget
+# week blocks are evicted least-recently-used first once the budget is exceeded, each block keeps the time it was
+# fetched so blocks of weeks that are not over yet (values still change) are fetched again after a while,
+# blocks of closed weeks never change and are never revalidated
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from PriceDiskCache import PriceDiskCache
+
+
+class PriceMemoryCache:
+    def __init__(self, max_bytes: int, revalidate_after: float):
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after  # in seconds, for weeks that are not closed
+        self.num_bytes = 0
+
+        # week stamp -> (timestamps, prices), ordered from least to most recently used
+        self.blocks = OrderedDict()
+        # week stamp -> time the block was fetched
+        self.time_fetched = {}
+
+        # statistics
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+        self.num_revalidations = 0
+
+    # check if a fresh block of the week is cached
+    def __contains__(self, week_stamp: int) -> bool:
+        return week_stamp in self.blocks and self.is_fresh(week_stamp)
+
+    # get block of the week and mark it as recently used
+    def __getitem__(self, week_stamp: int):
+        try:
+            block = self.blocks[week_stamp]
+        except KeyError:
+            self.num_misses += 1
+            raise
+        self.num_hits += 1
+        self.blocks.move_to_end(week_stamp)
+        return block
+
+    # add or replace block of the week and evict least recently used blocks above the byte budget
+    # replacing a block is a revalidation, the block was fetched again
+    def __setitem__(self, week_stamp: int, block: (np.ndarray, np.ndarray)):
+        if week_stamp in self.blocks:
+            self.num_revalidations += 1
+            self.remove(week_stamp)
+        self.blocks[week_stamp] = block
+        self.time_fetched[week_stamp] = time.time()
+        self.num_bytes += self.block_bytes(block)
+        self.evict()
+
+    def __len__(self):
+        return len(self.blocks)
+
+    # remove block of the week
+    def remove(self, week_stamp: int):
+        block = self.blocks.pop(week_stamp)
+        del self.time_fetched[week_stamp]
+        self.num_bytes -= self.block_bytes(block)
+        return block
+
+    # evict least recently used blocks until the budget is met, the most recent block is always kept
+    def evict(self):
+        while self.num_bytes > self.max_bytes and len(self.blocks) > 1:
+            self.remove(next(iter(self.blocks)))
+            self.num_evictions += 1
+
+    # check if a cached block can be used without fetching it again
+    def is_fresh(self, week_stamp: int) -> bool:
+        if PriceDiskCache.is_week_closed(week_stamp):
+            return True
+        return time.time() - self.time_fetched[week_stamp] < self.revalidate_after
+
+    @staticmethod
+    def block_bytes(block: (np.ndarray, np.ndarray)) -> int:
+        return sum(array.nbytes for array in block)
+
+    def __str__(self):
+        return f"{len(self.blocks)} week blocks, {self.num_bytes} / {self.max_bytes} bytes, hits: {self.num_hits}, " \
+               f"misses: {self.num_misses}, evictions: {self.num_evictions}, revalidations: {self.num_revalidations}"
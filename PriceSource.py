@@ -0,0 +1,114 @@
+# Price sources the ECE delegates to
+# every source returns week blocks as sorted (timestamps [s], prices [€/MWh]) arrays,
+# week blocks are keyed like smard.de: epoch time (milliseconds) of Monday, 00:00:00 (Berlin)
+from __future__ import annotations
+
+from abc import abstractmethod
+from enum import Enum
+
+import numpy as np
+
+import CONFIG
+from Enums import EcoInfo
+from PriceDiskCache import PriceDiskCache
+import smard_de
+
+
+# Enum of the available price sources
+class PriceSourceType(Enum):
+    SMARD = "smard"
+    FILE = "file"
+    SYNTHETIC = "synthetic"
+
+
+# general price source
+class PriceSource:
+    # length of a week block in seconds
+    WEEK_SECONDS = 7 * 24 * 3600
+    # sources waiting on I/O profit from fetching several week blocks concurrently
+    io_bound = True
+
+    @abstractmethod
+    def get_week_block(self, weekly_timestamp: int, eco_info: EcoInfo = EcoInfo.WHOLESALE):
+        """return (timestamps, prices) arrays of the week starting at weekly_timestamp (ms)"""
+        raise NotImplementedError
+
+    # create price source selected in a simulation configuration
+    @staticmethod
+    def from_config(config) -> PriceSource:
+        source_type = PriceSourceType(config.price_source)
+        if source_type is PriceSourceType.FILE:
+            return FilePriceSource(path=config.price_file)
+        if source_type is PriceSourceType.SYNTHETIC:
+            return SyntheticPriceSource(seed=config.price_seed)
+        return SmardPriceSource(cache=PriceDiskCache.from_config(config), base_url=config.smard_url,
+                                timeout=config.smard_timeout)
+
+
+# prices from smard.de, through the persistent cache
+class SmardPriceSource(PriceSource):
+    def __init__(self, cache: PriceDiskCache = None, base_url: str = None, timeout: float = None):
+        self.cache = cache
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def get_week_block(self, weekly_timestamp: int, eco_info: EcoInfo = EcoInfo.WHOLESALE):
+        return smard_de.request_week_block(eco_info.value, weekly_timestamp, cache=self.cache, base_url=self.base_url,
+                                           request_timeout=self.timeout)
+
+
+# prices from a local CSV or Parquet file with columns 'timestamp' (unix time [s]) and 'price'
+class FilePriceSource(PriceSource):
+    io_bound = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self.timestamps: np.ndarray = None
+        self.prices: np.ndarray = None
+
+    # read file on first use
+    def load(self):
+        import pandas as pd
+
+        if self.path.endswith('.parquet'):
+            data = pd.read_parquet(self.path, columns=['timestamp', 'price'])
+        else:
+            data = pd.read_csv(self.path, usecols=['timestamp', 'price'])
+        data = data.dropna().sort_values('timestamp')
+        self.timestamps = data['timestamp'].to_numpy(dtype=np.int64)
+        self.prices = data['price'].to_numpy(dtype=np.float64)
+
+    def get_week_block(self, weekly_timestamp: int, eco_info: EcoInfo = EcoInfo.WHOLESALE):
+        if self.timestamps is None:
+            self.load()
+        # the file is sorted, so the week block is a slice
+        time_start = weekly_timestamp // 1000
+        index_start, index_end = np.searchsorted(self.timestamps, [time_start, time_start + self.WEEK_SECONDS])
+        return self.timestamps[index_start:index_end], self.prices[index_start:index_end]
+
+
+# deterministic synthetic prices with daily and weekly shapes, generated without any I/O
+class SyntheticPriceSource(PriceSource):
+    io_bound = False
+
+    def __init__(self, seed: int = 0, price_base: float = 150.0, amplitude_daily: float = 0.3,
+                 amplitude_weekly: float = 0.15, noise: float = 0.05):
+        self.seed = seed
+        self.price_base = price_base  # mean price [€/MWh]
+        self.amplitude_daily = amplitude_daily  # relative swing over a day (low at night, peak in the evening)
+        self.amplitude_weekly = amplitude_weekly  # relative discount on weekends
+        self.noise = noise  # relative standard deviation of the noise
+
+    def get_week_block(self, weekly_timestamp: int, eco_info: EcoInfo = EcoInfo.WHOLESALE):
+        time_start = weekly_timestamp // 1000
+        timestamps = time_start + np.arange(0, self.WEEK_SECONDS, CONFIG.TIME_INTERVAL_UNIX, dtype=np.int64)
+        # hour of day and day of week (epoch started on a Thursday)
+        hours = (timestamps // 3600) % 24
+        days = (timestamps // 86400 + 3) % 7
+        shape_daily = -np.cos(2 * np.pi * (hours - 6) / 24)
+        shape_weekly = np.where(days >= 5, -1.0, 0.0)
+        # noise seeded per week, so a week has the same prices whatever order weeks are requested in
+        rng = np.random.default_rng([self.seed, int(time_start // self.WEEK_SECONDS)])
+        prices = self.price_base * (1 + self.amplitude_daily * shape_daily + self.amplitude_weekly * shape_weekly
+                                    + self.noise * rng.standard_normal(len(timestamps)))
+        return timestamps, np.round(prices, 2)
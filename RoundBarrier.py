@@ -0,0 +1,141 @@
+# Barrier of a bidding round
+# parties (machines, external market) declare how many bids they send in a round, the market module reports every bid
+# that arrives. The round is released once every declared bid arrived, or after the deadline with the bids it has,
+# so a slow or silent party cannot hold the round for everyone. Arrival latencies are kept per round.
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+
+# statistics of a released round
+@dataclass
+class RoundStats:
+    time: int = 0  # time-slot of the round
+    num_expected: int = 0
+    num_arrived: int = 0
+    timed_out: bool = False
+    latencies: list = field(default_factory=list)  # seconds from round opening to each arrival
+    parties_missing: list = field(default_factory=list)
+
+    @property
+    def latency_mean(self) -> float:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def latency_max(self) -> float:
+        return max(self.latencies, default=0.0)
+
+
+class RoundBarrier:
+    def __init__(self, deadline: float = None, on_release: callable = None):
+        self.deadline = deadline  # in seconds, None waits for all declared bids
+        self.on_release = on_release  # called with the time-slot of the round when it is released
+
+        self.time: int = None
+        self.is_open = False
+        self.is_sealed = False  # no party declares bids anymore
+        self.expected = {}  # party -> number of bids declared
+        self.arrived = {}  # party -> number of bids arrived
+        self.time_opened = 0.0
+        self.latencies = []
+        # event loop the deadline and the release future are bound to
+        self.loop: asyncio.AbstractEventLoop = None
+        self.timer: asyncio.TimerHandle = None
+        self.released: asyncio.Future = None
+
+        # statistics of all released rounds
+        self.stats: [RoundStats] = []
+
+    # open barrier for the round at a time-slot, the deadline runs only inside an event loop
+    def open(self, time_slot: int):
+        self.time = time_slot
+        self.is_open = True
+        self.is_sealed = False
+        self.expected = {}
+        self.arrived = {}
+        self.latencies = []
+        self.time_opened = time.perf_counter()
+        self.arm()
+
+    # bind deadline and release future of the open round to the running event loop, if there is one
+    def arm(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if loop is self.loop and self.released is not None:
+            return
+        self.loop = loop
+        self.released = loop.create_future()
+        if self.deadline:
+            # the deadline counts from the round opening, also if the round was opened outside the loop
+            self.timer = loop.call_later(max(0.0, self.deadline - (time.perf_counter() - self.time_opened)),
+                                         self.expire)
+
+    # party declares count bids for the open round
+    def expect(self, party: str, count: int = 1):
+        self.expected[party] = self.expected.get(party, 0) + count
+
+    # all parties declared their bids, release if they already arrived
+    def seal(self):
+        self.is_sealed = True
+        self.check()
+
+    # bid of a party arrived, False if the round is not open
+    def arrive(self, party: str) -> bool:
+        if not self.is_open:
+            return False
+        self.arrived[party] = self.arrived.get(party, 0) + 1
+        self.latencies.append(time.perf_counter() - self.time_opened)
+        self.check()
+        return True
+
+    # release round if every declared bid arrived
+    def check(self):
+        if self.is_open and self.is_sealed and \
+                all(self.arrived.get(party, 0) >= count for party, count in self.expected.items()):
+            self.release(timed_out=False)
+
+    # release round with the bids that arrived if its deadline passed
+    # called by the dispatcher after every message, the loop timer fires only once the dispatcher yields
+    def check_deadline(self):
+        if self.is_open and self.deadline and time.perf_counter() - self.time_opened >= self.deadline:
+            self.expire()
+
+    # release round with the bids that arrived
+    def expire(self):
+        if self.is_open:
+            self.release(timed_out=True)
+
+    def release(self, timed_out: bool):
+        self.is_open = False
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        released, self.released = self.released, None
+        stats = RoundStats(time=self.time, num_expected=sum(self.expected.values()),
+                           num_arrived=sum(self.arrived.values()), timed_out=timed_out, latencies=self.latencies,
+                           parties_missing=[party for party, count in self.expected.items()
+                                            if self.arrived.get(party, 0) < count])
+        self.stats.append(stats)
+        logger.info(f"Platform: round {self.time} released, {stats.num_arrived} / {stats.num_expected} bids, "
+                    f"latency mean {stats.latency_mean * 1000:.2f}ms, max {stats.latency_max * 1000:.2f}ms"
+                    + (f", missing: {stats.parties_missing}" if timed_out else ""))
+        if released is not None and not released.done():
+            released.set_result(self.time)
+        if self.on_release is not None:
+            self.on_release(self.time)
+
+    # check if bids for a time-slot are still accepted
+    def is_open_for(self, time_slot: int) -> bool:
+        return self.is_open and self.time == time_slot
+
+    # wait until the open round is released
+    async def wait(self):
+        if not self.is_open:
+            return
+        self.arm()
+        # shielded, a waiter that is cancelled does not cancel the release of the round
+        await asyncio.shield(self.released)
@@ -0,0 +1,184 @@
+# Sharded platform: machines split across worker processes
+# every shard (worker process) runs its own Platform with a contiguous block of the machines, each with its agent
+# handler, record keeper, scheduler and strategy block, so schedule generation and evaluation use all cores.
+# The coordinator keeps the external market and the bidding module and runs the bidding rounds; per round only
+# compact batches cross the process boundary:
+#   coordinator -> shard: (message, time of the round, [(bid_id, BidStatus value)] feedback of the previous round)
+#   shard -> coordinator: [(bid_id, energy, price, MarketRole value)] bids of the round
+# and once, when the shards are ready: (last bidding time, [(time_start, count)] time-slot ranges with bids)
+import multiprocessing
+
+from loguru import logger
+
+import CONFIG
+from Enums import BidStatus, MarketRole
+from ExternalMarket import ExternalMarket
+from TradingPlatform import Platform
+
+# messages sent from the coordinator to the shards
+MESSAGE_ROUND = "ROUND"
+MESSAGE_STOP = "STOP"
+
+
+# function run in each worker process, hosts the machines [machine_index_first, machine_index_first + num_machines)
+def run_shard(config: CONFIG.SimConfig, machine_index_first: int, num_machines: int, machine_jobs: list,
+              connection):
+    from Machine import Machine
+
+    platform = Platform(config=config)
+    # the coordinator runs the bidding rounds, the platform of a shard only serves the price requests of its machines
+    platform.bus.unsubscribe(platform.machine_bids_generated, CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BIDS_GENERATED)
+    # machines keep the ids they would have on a single platform
+    platform.machine_id = machine_index_first
+
+    machines = []
+    for _ in range(num_machines):
+        machine = Machine(platform)
+        machine.register_in_platform()
+        machines.append(machine)
+    for machine_index, job in machine_jobs:
+        machines[machine_index - machine_index_first].records_keeper.add_job(job)
+
+    # generate schedules, prices are requested from the ECE of the shard and bids are generated when they arrive
+    for machine in machines:
+        machine.scheduler.generate_schedules()
+    platform.bus.dispatch()
+
+    # report last bidding time and time-slots with bids of the shard
+    times_last = [machine.bidder.get_last_bidding_time() for machine in machines if machine.bidder.bids]
+    slots = [(bid_range.time_start, bid_range.count) for machine in machines for job_bid in machine.bidder.bids
+             for bid_range in job_bid.bid_ranges]
+    connection.send((max(times_last) if times_last else None, slots))
+
+    # bids waiting for feedback, keyed by bid_id
+    bids_sent = {}
+    num_bids = 0
+    while True:
+        message, time, feedback = connection.recv()
+        for bid_id, status in feedback:
+            bids_sent.pop(bid_id).feedback = BidStatus(status)
+        if message == MESSAGE_STOP:
+            break
+        batch = []
+        for machine in machines:
+            if machine.bidder.is_bid_time(time=time):
+                bid = machine.bidder.get_bid(time=time)
+                bids_sent[bid.my_id] = bid
+                batch.append((bid.my_id, bid.energy, bid.offer, MarketRole.BUYER.value))
+        num_bids += len(batch)
+        connection.send(batch)
+
+    connection.send(num_bids)
+    connection.close()
+
+
+class ShardedPlatform:
+    def __init__(self, config: CONFIG.SimConfig = None, num_shards: int = None, start_method: str = 'spawn'):
+        self.my_id = CONFIG.ID_COORDINATOR
+        self.config = config if config is not None else CONFIG.DEFAULT_CONFIG
+        num_shards = num_shards if num_shards is not None else self.config.shards
+        self.num_shards = max(1, min(num_shards, self.config.n_machines))
+        # spawn starts workers without copying the state of the coordinator
+        self.context = multiprocessing.get_context(start_method)
+
+        # platform of the coordinator: ECE for the external market and bidding module for clearing
+        self.platform = Platform(config=self.config)
+        self.market = self.platform.market
+        self.external_market = ExternalMarket(self.platform)
+        self.external_market.register_in_platform()
+
+        # worker processes and their connections
+        self.processes = []
+        self.connections = []
+
+        # count of market rounds
+        self.num_bidding_rounds = 0
+        self.num_bids = 0
+
+    # start one worker process per shard with a contiguous block of machines and their jobs
+    def start(self, machine_jobs: list, suppliers_data: dict):
+        n_machines = self.config.n_machines
+        for shard in range(self.num_shards):
+            machine_index_first = shard * n_machines // self.num_shards
+            machine_index_end = (shard + 1) * n_machines // self.num_shards
+            shard_jobs = [(machine_index, job) for machine_index, job in machine_jobs
+                          if machine_index_first <= machine_index < machine_index_end]
+            connection, connection_worker = self.context.Pipe()
+            process = self.context.Process(target=run_shard, name=f"{self.my_id}-{shard}",
+                                           args=(self.config, machine_index_first,
+                                                 machine_index_end - machine_index_first, shard_jobs,
+                                                 connection_worker))
+            process.start()
+            self.processes.append(process)
+            self.connections.append(connection)
+            logger.info(self.my_id + ' ' + f'shard {shard}: machines {machine_index_first + 1} to {machine_index_end}')
+
+        # suppliers get their prices from the ECE of the coordinator while the shards generate schedules
+        self.external_market.create_suppliers(data=suppliers_data)
+        self.platform.bus.dispatch()
+
+    # run bidding rounds until the last bidding time of all shards, then stop the shards
+    def run(self):
+        # wait for all shards to generate their bids
+        times_last = []
+        for connection in self.connections:
+            time_last, slots = connection.recv()
+            if time_last is not None:
+                times_last.append(time_last)
+            for time_start, count in slots:
+                self.platform.clock.add(time_start=time_start, count=count)
+        time_final = max(times_last) if times_last else self.platform.time_running
+        logger.info(self.my_id + ' ' + f'{self.num_shards} shards ready, bidding until {time_final}')
+
+        feedback_shards = [[] for _ in self.connections]
+        # supplier bids waiting for feedback, keyed by bid_id
+        bids_supplier = {}
+        # run rounds only at time-slots with bids
+        while True:
+            time = self.platform.clock.next_time(time=self.platform.time_running)
+            if time is None or time > time_final:
+                break
+            self.market.record_no_trade(time_start=self.platform.time_unrecorded, time_end=time)
+            self.platform.time_running = time
+            self.platform.time_unrecorded = time + CONFIG.TIME_INTERVAL_UNIX
+            self.num_bidding_rounds += 1
+
+            # open round on all shards at once, feedback of the previous round travels with it
+            for connection, feedback in zip(self.connections, feedback_shards):
+                connection.send((MESSAGE_ROUND, time, feedback))
+            batches = [connection.recv() for connection in self.connections]
+
+            bids = [bid for batch in batches for bid in batch]
+            for supplier in self.external_market.suppliers:
+                for bid in supplier.get_bids_time(time=time):
+                    bids_supplier[bid.my_id] = bid
+                    bids.append((bid.my_id, bid.energy, bid.offer, MarketRole.SELLER.value))
+            self.num_bids += len(bids)
+
+            # clear round and split feedback back to its shard
+            feedback = self.market.clear_bids(bids=bids)
+            feedback_shards = [[(bid_id, feedback[bid_id].value) for bid_id, _, _, _ in batch] for batch in batches]
+            for bid_id, status in feedback.items():
+                if bid_id in bids_supplier:
+                    bids_supplier.pop(bid_id).feedback = status
+            logger.info(self.my_id + ' ' + f'bidding round {self.num_bidding_rounds} at {time}: {len(bids)} bids')
+        # slots after the last round up to the final time had no bids
+        self.market.record_no_trade(time_start=self.platform.time_unrecorded,
+                                    time_end=time_final + CONFIG.TIME_INTERVAL_UNIX)
+
+        self.stop(feedback_shards=feedback_shards)
+        logger.info(self.my_id + ' ' + f'bidding concluded after {self.num_bidding_rounds} rounds, '
+                                       f'{self.num_bids} bids')
+
+    # stop shards after delivering the feedback of the last round
+    def stop(self, feedback_shards: list = None):
+        feedback_shards = feedback_shards if feedback_shards is not None else [[] for _ in self.connections]
+        for connection, feedback in zip(self.connections, feedback_shards):
+            connection.send((MESSAGE_STOP, None, feedback))
+        for connection in self.connections:
+            connection.recv()
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes.clear()
+        self.connections.clear()
@@ -0,0 +1,36 @@
+# Time grid of the simulation
+# maps unix timestamps to integer slot indexes relative to the reference timestamp, slot math is index arithmetic
+import numpy as np
+
+
+class TimeGrid:
+    def __init__(self, ref_timestamp: int, interval: int):
+        self.ref_timestamp = int(ref_timestamp)
+        self.interval = int(interval)  # slot size in seconds
+
+    # slot index of a timestamp (slots before the reference timestamp have negative indexes)
+    def index(self, time: int) -> int:
+        return (int(time) - self.ref_timestamp) // self.interval
+
+    # slot indexes of an array of timestamps
+    def indexes(self, times) -> np.ndarray:
+        return (np.asarray(times, dtype=np.int64) - self.ref_timestamp) // self.interval
+
+    # timestamp at the start of a slot index
+    def timestamp(self, index: int) -> int:
+        return self.ref_timestamp + int(index) * self.interval
+
+    # number of whole slots between time_start and time_end
+    def count(self, time_start: int, time_end: int) -> int:
+        return max(0, int((time_end - time_start) / self.interval))
+
+    # timestamps of all slots from time_start up to time_end (exclusive) as a NumPy range
+    def time_range(self, time_start: int, time_end: int) -> np.ndarray:
+        return int(time_start) + np.arange(self.count(time_start, time_end), dtype=np.int64) * self.interval
+
+    # offset of time inside a range of slots starting at time_start, None if not on a slot of that range
+    def offset(self, time_start: int, time: int, count: int):
+        offset, remainder = divmod(int(time) - int(time_start), self.interval)
+        if remainder or not 0 <= offset < count:
+            return None
+        return offset
@@ -1,26 +1,32 @@
 # class for the all-encompassing platform XD
 import asyncio
 
-import pubsub.pub
 from loguru import logger
-from pubsub import pub
 
 import CONFIG
 from Agent import Agent
 from CC import FCC, BCC
 from ECE import ECE
-from ExternalMarket import ExternalMarket
+from EventClock import EventClock
+from HorizonTracker import HorizonTracker
 from Machine import Machine
-from AgentHandler import AgentHandler
+from MessageBus import MessageBus
 from PlatformAgentHandler import PlatformAgentHandler
 from PlatformEntity import PlatformEntity
 from PlatfromHashTable import PlatformHashTable
 from PlatformBiddingModule import PlatformBiddingModule
+from RoundBarrier import RoundBarrier
 
 
 class Platform:
-    def __init__(self):
+    def __init__(self, config: CONFIG.SimConfig = None):
         self.my_id = CONFIG.ID_PLATFORM
+        # simulation parameters of this platform instance
+        self.config = config if config is not None else CONFIG.DEFAULT_CONFIG
+        # message bus all platform entities publish and subscribe on, created before any entity subscribes
+        self.bus = MessageBus()
+        # routing table: entity id -> bound receive handler, filled when entities register
+        self.routes = {}
 
         # Agent Handler
         self.agents_handler = PlatformAgentHandler(self)
@@ -49,42 +55,68 @@ class Platform:
         self.registered_entities.insert(self.market)
         self.registered_entities.insert(self.bcc)
 
-        # count of machines with ready bids
-        self.num_machine_bids_ready = 0
-        self.num_bids_ready = 0
+        # count of machines that generated their bids
+        self.num_machines_bids_generated = 0
+        # barrier of the open bidding round, released when all declared bids arrived or after the deadline
+        self.barrier = RoundBarrier(deadline=self.config.round_deadline or None, on_release=self.round_bids_received)
+        if self.barrier.deadline:
+            self.bus.watch(self.barrier.check_deadline)
         # count of market rounds
         self.num_bidding_rounds = 0
 
         # system time: start with reference timestamp
-        self.time_running = CONFIG.REF_TIMESTAMP
-        self.time_final = CONFIG.REF_TIMESTAMP
+        self.time_running = self.config.ref_timestamp
+        # first slot that neither had a round nor was recorded as a slot without trade
+        self.time_unrecorded = self.time_running
+        self.time_final = self.config.ref_timestamp
+        # index of the time-slots with bids, bidding rounds run only at these slots
+        self.clock = EventClock(self.config.time_grid)
+        # finish times of the machine bids, updated by the machines as bids are placed or withdrawn
+        self.horizon = HorizonTracker()
 
         # subscribe to notification of machine bids status
-        pub.subscribe(self.machine_bids_generated, topicName=CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BIDS_GENERATED)
-        pub.subscribe(self.machine_bid_ready, topicName=CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BID_READY)
-
-    # run the TradingPlatform from main
-    def run(self):
-        self.fcc.run()
+        self.bus.subscribe(self.machine_bids_generated, topicName=CONFIG.TOPIC_PLATFORM_NOTIFY_MACHINE_BIDS_GENERATED)
+
+    # run the TradingPlatform from main: dispatch messages until no message is pending
+    async def run(self):
+        await self.bus.run_until_idle()
+        # rounds can still be cleared in the background or wait for late bids
+        while self.barrier.is_open or self.market.rounds_clearing:
+            waiting = set(self.market.rounds_clearing)
+            if self.barrier.is_open and self.barrier.deadline:
+                waiting.add(asyncio.ensure_future(self.barrier.wait()))
+            if waiting:
+                _, pending = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                [future.cancel() for future in pending if future not in self.market.rounds_clearing]
+            else:
+                # without deadline no late bid can arrive anymore
+                self.barrier.expire()
+            await self.bus.run_until_idle()
 
     # function to to_destination agent to source_id by CC
     def agent_to_source(self, agent: Agent):
-        entity = self.registered_entities.find(agent.source_id)
-        # entity.receive_agent(agent=agent)
-        pub.sendMessage(topicName=entity.topic, agent=agent)
+        self.route_agent(entity_id=agent.source_id, agent=agent)
 
     # function to to_destination agent to destination
     def agent_to_destination(self, agent: Agent):
-        entity = self.registered_entities.find(agent.destination_id)
-        # entity.receive_agent(agent=agent)
-        pub.sendMessage(topicName=entity.topic, agent=agent)
+        self.route_agent(entity_id=agent.destination_id, agent=agent)
+
+    # function to post agent to the receive handler of an entity, observers are notified only if enabled
+    def route_agent(self, entity_id: str, agent: Agent):
+        self.bus.post(self.routes[entity_id], agent=agent)
+        if self.config.observe_agents:
+            self.bus.sendMessage(topicName=CONFIG.TOPIC_PLATFORM_AGENT_MOVED, agent=agent)
+
+    # function to add receive handler of an entity to the routing table
+    def register_route(self, entity_id: str, receive_agent):
+        self.routes[entity_id] = receive_agent
 
     # function to be called by machines to signal ready for trading
     def machine_bids_generated(self):
-        self.num_machine_bids_ready += 1
-        logger.info(f"Platform: {self.num_machine_bids_ready} entities ready to next bid")
+        self.num_machines_bids_generated += 1
+        logger.info(f"Platform: {self.num_machines_bids_generated} entities ready to next bid")
         # check if number of bids ready is equal to the number of machines
-        if self.num_machine_bids_ready >= self.machine_id:
+        if self.num_machines_bids_generated == self.machine_id:
             logger.info(f"Platform: Machines are ready to bid, Market can start")
             # get final bidding time from machines
             self.find_market_final_time()
@@ -95,32 +127,28 @@ class Platform:
     def bidding_round_end(self):
         # increment bidding rounds counter
         self.num_bidding_rounds += 1
-        # reset bid counters
-        self.num_machine_bids_ready = 0
-        self.num_bids_ready = 0
-        # Move to next time slot
-        self.time_running += CONFIG.TIME_INTERVAL_UNIX
+        # bids may have been placed or withdrawn during the round
+        self.find_market_final_time()
+        # Move to next time slot with bids, slots in between have no trade
+        time_next = self.clock.next_time(time=self.time_running)
+        if time_next is None or time_next > self.time_final:
+            time_next = self.time_final + CONFIG.TIME_INTERVAL_UNIX
+        self.market.record_no_trade(time_start=self.time_unrecorded, time_end=time_next)
+        self.time_running = time_next
+        self.time_unrecorded = time_next + CONFIG.TIME_INTERVAL_UNIX
         # Check if bidding is still not at end time
         if self.time_running <= self.time_final:
             logger.info(f"Platform: bidding round {self.num_bidding_rounds} start")
             self.signal_market_ready()
         else:
             logger.info(f"Platform: bidding concluded after {self.num_bidding_rounds} rounds")
+            self.fcc.log_grant_latencies()
+            self.bcc.log_grant_latencies()
 
-    def machine_bid_ready(self):
-        self.num_machine_bids_ready += 1
-        logger.info(f"Platform: {self.num_machine_bids_ready} entities ready to bid")
-        self.market_bid_received()
-
-    # function called by bidding module to inform about number of bids received
-    def market_bid_received(self):
-        self.num_bids_ready += 1
-        # check if all bids where submitted
-        # checks = (num >= self.machine_id + self.external_market_num_bids - 2)
-        # checks = self.num_machine_bids_ready + self.num_bids_ready >= self.machine_id + CONFIG.N_JOBS
-        checks = self.num_machine_bids_ready >= self.machine_id
-        if checks:
-            self.market.start_bidding_round()
+    # function called by the round barrier when all bids of the round arrived or its deadline passed
+    def round_bids_received(self, time: int):
+        # clear the market from the dispatcher, not from inside the arrival of the last bid
+        self.bus.post(self.market.start_bidding_round)
 
     # Helper methods
 
@@ -128,7 +156,7 @@ class Platform:
     def get_machine_id(self, new_machine):
         # generate new entity_id string with formatting
         self.machine_id += 1
-        machine_id = CONFIG.NAME_MACHINE + str(self.machine_id).zfill(CONFIG.NAME_ZERO_FILL)
+        machine_id = CONFIG.NAME_MACHINE + str(self.machine_id).zfill(self.config.name_zero_fill)
 
         # set entity_id before inserting into HashTable
         new_machine.my_id = machine_id
@@ -141,8 +169,12 @@ class Platform:
 
     # notify machines that market is ready for bids at a certain time
     def signal_market_ready(self):
+        # open round, entities declare their bids while handling the market-ready message
+        self.barrier.open(time_slot=self.time_running)
         # publish on market-ready topic
-        pub.sendMessage(CONFIG.TOPIC_PLATFORM_MARKET_READY)
+        self.bus.sendMessage(CONFIG.TOPIC_PLATFORM_MARKET_READY)
+        # seal round after all entities handled the market-ready message
+        self.bus.post(self.barrier.seal)
         # loop over all registered entities
         # for entity in self.registered_entities.values():
         #     # check if entity is a employer or external market
@@ -154,25 +186,15 @@ class Platform:
         #         pass
         pass
 
-    # function used to find market end time
+    # function used to find market end time: last finish time of the machine bids placed, if after the reference time
     def find_market_final_time(self):
-        # loop over all registered entities
-        for entity in self.registered_entities.values():
-            # check if entity is an ExternalMarket
-            try:
-                if ExternalMarket is type(entity.employer):
-                    pass
-                # check if entity is a employer
-                elif AgentHandler is type(entity):
-                    # get employer final time
-                    entity_final_time = entity.employer.bidder.get_last_bidding_time()
-                    # check and
-                    self.time_final = entity_final_time if self.time_final < entity_final_time else self.time_final
-            except AttributeError:
-                pass
+        time_last = self.horizon.time_last
+        self.time_final = self.config.ref_timestamp if time_last is None else max(time_last, self.config.ref_timestamp)
 
     # function to register external entities in the platform
     def register_external_entity(self, entity: Machine):
         # add to registered_entities table
         self.registered_entities.insert(entity.agents_handler)
+        # route agents directly to the agent handler
+        self.register_route(entity_id=entity.agents_handler.my_id, receive_agent=entity.agents_handler.receive_agent)
 
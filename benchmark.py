@@ -0,0 +1,332 @@
+# Benchmarks for the platform, run as e.g.: python benchmark.py startup --budget 0.5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# modules that must not be loaded just by creating a Platform
+LIST_STARTUP_HEAVY_MODULES = ['pandas', 'pymarket', 'matplotlib', 'networkx', 'requests', 'SchedulingStrategies']
+
+# script run in a fresh interpreter, reports time until Platform() is ready and the heavy modules imported
+STARTUP_SCRIPT = f"""
+import json, sys, time
+time_start = time.perf_counter()
+import TradingPlatform
+platform = TradingPlatform.Platform()
+time_ready = time.perf_counter() - time_start
+heavy = [module for module in {LIST_STARTUP_HEAVY_MODULES!r} if module in sys.modules]
+print(json.dumps({{'time': time_ready, 'heavy': heavy}}))
+"""
+
+
+# measure the time a simulation worker needs from interpreter start to Platform()
+def startup(repeat: int = 5) -> dict:
+    times = []
+    heavy = []
+    for _ in range(repeat):
+        # fresh interpreter per measurement, stdin closed so that any prompt fails instead of hanging
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=60, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        times.append(result['time'])
+        heavy = result['heavy']
+    return {'median': statistics.median(times), 'min': min(times), 'max': max(times), 'heavy': heavy}
+
+
+# entity that only counts the agents it receives
+class HopEntity:
+    def __init__(self, my_id: str):
+        self.my_id = my_id
+        self.topic = 'Benchmark.' + my_id
+        self.num_received = 0
+
+    def receive_agent(self, agent):
+        self.num_received += 1
+
+
+# measure agent hops per second from Platform.agent_to_destination to the receive handler of the destination
+# routes: routing table (current), topics: lookup in registered_entities and topic of the entity on the platform bus,
+# pubsub: lookup and pypubsub topic (as before the platform bus, only if pypubsub is installed)
+def agent_hops(num_hops: int = 100000, repeat: int = 5, batch_size: int = 1000) -> dict:
+    import TradingPlatform
+    from Agent import Agent
+
+    modes = ['routes', 'topics']
+    try:
+        from pubsub import pub
+        modes.append('pubsub')
+    except ImportError:
+        pub = None
+
+    results = {}
+    for mode in modes:
+        platform = TradingPlatform.Platform()
+        entity = HopEntity(my_id='BENCHMARK')
+        platform.registered_entities.insert(entity)
+        platform.register_route(entity_id=entity.my_id, receive_agent=entity.receive_agent)
+        platform.bus.subscribe(entity.receive_agent, topicName=entity.topic)
+        if pub is not None and mode == 'pubsub':
+            pub.subscribe(entity.receive_agent, entity.topic)
+
+        # agent moves of each mode
+        def move_routes(agent):
+            platform.agent_to_destination(agent=agent)
+
+        def move_topics(agent):
+            destination = platform.registered_entities.find(agent.destination_id)
+            platform.bus.sendMessage(topicName=destination.topic, agent=agent)
+
+        def move_pubsub(agent):
+            destination = platform.registered_entities.find(agent.destination_id)
+            pub.sendMessage(destination.topic, agent=agent)
+
+        move = {'routes': move_routes, 'topics': move_topics, 'pubsub': move_pubsub}[mode]
+        agent = Agent(my_id='BENCHMARK_AGENT', destination_id=entity.my_id)
+        agent.platform = platform
+
+        rates = []
+        for _ in range(repeat):
+            time_start = time.perf_counter()
+            for num in range(1, num_hops + 1):
+                move(agent)
+                if not num % batch_size:
+                    platform.bus.dispatch()
+            platform.bus.dispatch()
+            rates.append(num_hops / (time.perf_counter() - time_start))
+        if entity.num_received != num_hops * repeat:
+            raise RuntimeError(f"{mode}: {entity.num_received} of {num_hops * repeat} agents received")
+        results[mode] = statistics.median(rates)
+    return results
+
+
+# bytes of a message object with its per-object dict and its field record or dict, if any
+def message_size(message) -> int:
+    size = sys.getsizeof(message)
+    if hasattr(message, '__dict__'):
+        size += sys.getsizeof(message.__dict__)
+    for name in ('data_to_find', 'data'):
+        fields = getattr(message, name, None)
+        if fields is not None:
+            size += sys.getsizeof(fields)
+            if isinstance(getattr(fields, 'values', None), list):
+                size += sys.getsizeof(fields.values)
+    return size
+
+
+# measure bytes per in-flight message object of a bid and the time of one bid hop:
+# agent filled from the mayfly, drone copied from the agent, both reset for reuse
+def message_records(num_hops: int = 100000, repeat: int = 5) -> dict:
+    from Agent import Agent, AgentRole, Drone
+    from DataPoint import Mayfly, Request
+    from Enums import MarketRole
+
+    mayfly = Mayfly(request_id='BENCHMARK_REQUEST')
+    mayfly.create_bidding_params(bid_id='BENCHMARK_BID', time_slot=0, energy=1.0, price=1.0, role=MarketRole.BUYER)
+    request = Request(request_id=mayfly.request_id, source_id='BENCHMARK', destination_id='BENCHMARK',
+                      data_id=mayfly.data_id)
+    agent = Agent(my_id='BENCHMARK_AGENT')
+    agent.set_role(AgentRole.BIDDING)
+    agent.request_data_to_find(mayfly=mayfly)
+    drone = Drone(my_id='BENCHMARK_DRONE')
+    drone.copy_agent(agent=agent)
+    sizes = {name: message_size(message) for name, message in
+             (('request', request), ('mayfly', mayfly), ('agent', agent), ('drone', drone))}
+
+    times = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        for _ in range(num_hops):
+            agent.request_data_to_find(mayfly=mayfly)
+            drone.copy_agent(agent=agent)
+            drone.reset_assignment()
+            agent.reset_assignment()
+        times.append((time.perf_counter() - time_start) / num_hops)
+    return {'sizes': sizes, 'time_hop': statistics.median(times)}
+
+
+# party that declares a bid every round and then keeps the dispatcher busy in blocking steps without sending it
+class SlowParty:
+    def __init__(self, platform, step: float):
+        import CONFIG
+
+        self.my_id = 'BENCHMARK_SLOW'
+        self.platform = platform
+        self.step = step  # seconds the dispatcher is blocked per step
+        platform.bus.subscribe(self.start_bidding_round, topicName=CONFIG.TOPIC_PLATFORM_MARKET_READY)
+
+    def start_bidding_round(self):
+        self.platform.barrier.expect(party=self.my_id)
+        self.platform.bus.post(self.work, time_slot=self.platform.time_running)
+
+    # block the dispatcher until the round of the time-slot is closed
+    def work(self, time_slot: int):
+        if self.platform.barrier.is_open_for(time_slot=time_slot):
+            time.sleep(self.step)
+            self.platform.bus.post(self.work, time_slot=time_slot)
+
+
+# platform with an external market whose suppliers bid in every round, prices from the synthetic source
+def create_market_platform(options: dict):
+    import asyncio
+    import random
+    import CONFIG
+    import DataGenerator
+    from ExternalMarket import ExternalMarket
+    from TradingPlatform import Platform
+
+    random.seed(0)
+    platform = Platform(CONFIG.SimConfig(options=dict(options, price_source='synthetic')))
+    external_market = ExternalMarket(platform)
+    external_market.register_in_platform()
+    machine_jobs, suppliers_data, duration_list = DataGenerator.generate_data(config=platform.config)
+    external_market.create_suppliers(data=suppliers_data)
+    asyncio.run(platform.run())
+    return platform
+
+
+# run bidding rounds at the next num_rounds time-slots, started as if the machines were ready
+def run_rounds(platform, num_rounds: int):
+    import asyncio
+
+    interval = platform.config.time_grid.interval
+    platform.clock.add(time_start=platform.time_running + interval, count=num_rounds)
+    platform.horizon.add(platform.time_running + num_rounds * interval)
+
+    async def run():
+        platform.find_market_final_time()
+        platform.bidding_round_end()
+        await platform.run()
+    asyncio.run(run())
+
+
+# run bidding rounds with an external market and a slow party, measure how long after its deadline each round
+# is released and check that every round was released with the bids of the external market only
+def round_deadline(deadline: float = 0.1, step: float = 0.001, num_rounds: int = 20) -> dict:
+    platform = create_market_platform(options={'round_deadline': deadline})
+    SlowParty(platform=platform, step=step)
+
+    # time from the opening of each round to its release
+    times_release = []
+    on_release = platform.barrier.on_release
+
+    def record_release(time_slot: int):
+        times_release.append(time.perf_counter() - platform.barrier.time_opened)
+        on_release(time_slot)
+    platform.barrier.on_release = record_release
+
+    run_rounds(platform=platform, num_rounds=num_rounds)
+
+    stats = platform.barrier.stats[-len(times_release):]
+    is_released_without_slow = [round_stats.timed_out and round_stats.parties_missing == ['BENCHMARK_SLOW'] and
+                                round_stats.num_arrived == round_stats.num_expected - 1 for round_stats in stats]
+    return {'num_rounds': len(times_release), 'late_max': max(times_release) - deadline,
+            'late_median': statistics.median(times_release) - deadline,
+            'released_without_slow': sum(is_released_without_slow)}
+
+
+# run bidding rounds with an external market that keeps the elastic agent pool exhausted, the pool grows only by
+# the time requests wait (not by their number), count the transactions that ended while it waited before growing
+def agent_pool(grow_wait: float = 0.0005, num_rounds: int = 10) -> dict:
+    platform = create_market_platform(options={'agents_elastic': True, 'agents_grow_depth': 2 ** 30,
+                                               'agents_grow_wait': grow_wait})
+    agents_handler = platform.agents_handler
+    num_agents_start = agents_handler.num_agents
+
+    # time of every terminated transaction
+    times_terminated = []
+    terminate_transaction = agents_handler.terminate_transaction
+
+    def record_terminated(agent):
+        times_terminated.append(time.perf_counter())
+        terminate_transaction(agent)
+    agents_handler.terminate_transaction = record_terminated
+
+    run_rounds(platform=platform, num_rounds=num_rounds)
+
+    grows = [decision for decision in agents_handler.sizing_log if decision.action == 'grow']
+    num_terminated_waiting = 0
+    if grows:
+        time_exhausted = grows[0].time - grows[0].time_waiting
+        num_terminated_waiting = sum(time_exhausted <= time_terminated <= grows[0].time
+                                     for time_terminated in times_terminated)
+    return {'num_agents_start': num_agents_start, 'num_agents': agents_handler.num_agents,
+            'num_grows': len(grows), 'time_waiting': grows[0].time_waiting if grows else 0.0,
+            'num_terminated_waiting': num_terminated_waiting}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Platform benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    parser_startup = subparsers.add_parser('startup', help="time from interpreter start to Platform()")
+    parser_startup.add_argument('--repeat', type=int, default=5)
+    parser_startup.add_argument('--budget', type=float, default=None, help="fail if median time exceeds budget [s]")
+    parser_hops = subparsers.add_parser('agent_hops', help="agent hops per second through the platform")
+    parser_hops.add_argument('--hops', type=int, default=100000)
+    parser_hops.add_argument('--repeat', type=int, default=5)
+    parser_records = subparsers.add_parser('message_records', help="bytes per message object and time per bid hop")
+    parser_records.add_argument('--hops', type=int, default=100000)
+    parser_records.add_argument('--repeat', type=int, default=5)
+    parser_deadline = subparsers.add_parser('round_deadline', help="release of rounds with a slow party after "
+                                                                   "their deadline")
+    parser_deadline.add_argument('--deadline', type=float, default=0.1)
+    parser_deadline.add_argument('--step', type=float, default=0.001, help="seconds the slow party blocks per step")
+    parser_deadline.add_argument('--tolerance', type=float, default=0.01, help="fail if a round is released later "
+                                                                                "than a step and tolerance [s]")
+    parser_deadline.add_argument('--rounds', type=int, default=20)
+    parser_pool = subparsers.add_parser('agent_pool', help="growth of the elastic agent pool under sustained load")
+    parser_pool.add_argument('--grow-wait', type=float, default=0.0005)
+    parser_pool.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'startup':
+        result = startup(repeat=args.repeat)
+        print(f"startup to Platform(): median {result['median'] * 1000:.1f}ms, "
+              f"min {result['min'] * 1000:.1f}ms, max {result['max'] * 1000:.1f}ms")
+        # fail if heavy modules are imported on startup or budget is exceeded
+        if result['heavy']:
+            print(f"heavy modules imported on startup: {result['heavy']}")
+            return 1
+        if args.budget is not None and result['median'] > args.budget:
+            print(f"startup budget of {args.budget * 1000:.1f}ms exceeded")
+            return 1
+    elif args.benchmark == 'agent_hops':
+        from loguru import logger
+        logger.remove()
+        result = agent_hops(num_hops=args.hops, repeat=args.repeat)
+        for mode, rate in result.items():
+            print(f"agent hops via {mode}: {rate:,.0f}/s ({rate / result['routes']:.2f}x routes)")
+    elif args.benchmark == 'message_records':
+        result = message_records(num_hops=args.hops, repeat=args.repeat)
+        print(", ".join(f"{name}: {size} bytes" for name, size in result['sizes'].items()))
+        print(f"bid hop (fill, copy, reset): {result['time_hop'] * 1e6:.2f}us")
+    elif args.benchmark == 'round_deadline':
+        from loguru import logger
+        logger.remove()
+        result = round_deadline(deadline=args.deadline, step=args.step, num_rounds=args.rounds)
+        print(f"{result['num_rounds']} rounds released after their deadline by median "
+              f"{result['late_median'] * 1000:.1f}ms, max {result['late_max'] * 1000:.1f}ms, "
+              f"{result['released_without_slow']} without the bids of the slow party only")
+        # fail if a round waited for the slow party or was released later than one step after its deadline
+        if result['released_without_slow'] < result['num_rounds'] or \
+                result['late_max'] > args.step + args.tolerance:
+            print("rounds not released on time")
+            return 1
+    elif args.benchmark == 'agent_pool':
+        from loguru import logger
+        logger.remove()
+        result = agent_pool(grow_wait=args.grow_wait, num_rounds=args.rounds)
+        print(f"agent pool grew {result['num_grows']} times from {result['num_agents_start']} to "
+              f"{result['num_agents']} agents, first after waiting {result['time_waiting'] * 1000:.2f}ms "
+              f"over {result['num_terminated_waiting']} terminated transactions")
+        # fail if the pool did not grow while it stayed exhausted across transactions
+        if not result['num_grows'] or result['num_terminated_waiting'] < 2:
+            print("agent pool did not grow under sustained load")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,5 @@
 from loguru import logger
 import asyncio
-import sys
 
 import CONFIG
 import DataGenerator
@@ -8,26 +7,33 @@ from DataAnalyzer import DataAnalyzer
 from ExternalMarket import ExternalMarket
 from TradingPlatform import Platform
 from Machine import Machine
+from ShardedPlatform import ShardedPlatform
 
 
-async def run():
+async def run(config: CONFIG.SimConfig):
     # create logger
     logger.add('log/log' + CONFIG.get_time_key())
+    logger.info(f'Running profile: {config}')
+
+    # run machines in worker processes if sharded
+    if config.shards:
+        run_sharded(config=config)
+        return
 
     # instantiate platform and other modules
-    platform = Platform()
+    platform = Platform(config=config)
     external_market = ExternalMarket(platform)
     external_market.register_in_platform()
 
     # create registered_entities
     machines = []
-    for _ in range(CONFIG.N_MACHINES):
+    for _ in range(config.n_machines):
         machine = Machine(platform)
         machine.register_in_platform()
         machines.append(machine)
 
     # generate data_response
-    machine_jobs, suppliers_data, duration_list = DataGenerator.generate_data()
+    machine_jobs, suppliers_data, duration_list = DataGenerator.generate_data(config=config)
     external_market.create_suppliers(data=suppliers_data)
 
     # add jobs to the registered_entities
@@ -41,14 +47,27 @@ async def run():
         # # evaluate schedule output
         machine.scheduler.print_schedules()
         # # machine.scheduler.plot_schedules()
-        machine.bidder.print_bids()
 
         # DataAnalyzer.box_plot(duration_list)
         pass
 
-    # platform.run()
+    # dispatch agents until all requests and bidding rounds are done
+    await platform.run()
+    logger.info(f'Message bus: {platform.bus}')
+
+    # evaluate bids generated during the run
+    for machine in machines:
+        machine.bidder.print_bids()
+
+
+# run with machines split across worker processes, the bidding rounds are run by a coordinator
+def run_sharded(config: CONFIG.SimConfig):
+    sharded_platform = ShardedPlatform(config=config)
+    machine_jobs, suppliers_data, duration_list = DataGenerator.generate_data(config=config)
+    sharded_platform.start(machine_jobs=machine_jobs, suppliers_data=suppliers_data)
+    sharded_platform.run()
 
 
 if __name__ == "__main__":
-    # sys.setrecursionlimit(10000)
-    asyncio.run(run())
+    # resolve simulation parameters from command-line arguments, environment or CONFIG_PROFILES.ini
+    asyncio.run(run(config=CONFIG.SimConfig.from_args()))
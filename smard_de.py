@@ -2,11 +2,12 @@
 # Read wholesale offer agent from smard.de. Extensible through use of other filters.
 
 import datetime
-import requests
 from typing import Union
+import numpy as np
 from pytz import timezone
 
 import CONFIG
+from PriceDiskCache import PriceDiskCache
 
 # agent is available in 1-week blocks, starting at epoch time (milliseconds) on Mondays, 00:00:00 (Berlin),
 # therefore: determine most recent index
@@ -16,6 +17,11 @@ import CONFIG
 region = "DE"
 resolution = "hour"
 berlin = timezone('Europe/Berlin')
+# url, timeout and persistent cache are taken from the configuration passed by the caller, the process default
+# configuration is only used if none is passed
+
+# persistent cache of week blocks per configuration, used when no cache is passed explicitly
+default_caches = {}
 
 # excerpt of filters. All filters available in source_id above.
 WHOLESALE = 4169  # 4169: Wholesale market offer for region DE-LU
@@ -24,10 +30,23 @@ RENEWABLE_GEN = 5097  # 5097: Forecasted renewable generation
 CONVENTIONAL_GEN = 715  # 715:  Forecasted conventional generation
 
 
-def get_latest_date(filter_var=WHOLESALE):
+# persistent cache of week blocks of a configuration, created on first use
+def default_cache(config: CONFIG.SimConfig = None) -> PriceDiskCache:
+    config = config if config is not None else CONFIG.DEFAULT_CONFIG
+    if config not in default_caches:
+        default_caches[config] = PriceDiskCache.from_config(config)
+    return default_caches[config]
+
+
+def get_latest_date(filter_var=WHOLESALE, config: CONFIG.SimConfig = None):
+    # imported on first use, importing this module must not cost startup time or network access
+    import requests
+    config = config if config is not None else CONFIG.DEFAULT_CONFIG
+
     # get available timestamps. Filter is mandatory, could be changed according to requested agent, though.
+    # a stalled request fails after the timeout instead of blocking the caller
     timestamps_available = requests.get(
-        f"https://www.smard.de/app/chart_data/{filter_var}/{region}/index_{resolution}.json"
+        f"{config.smard_url}/{filter_var}/{region}/index_{resolution}.json", timeout=config.smard_timeout
     ).json()
 
     # select most current block
@@ -37,47 +56,90 @@ def get_latest_date(filter_var=WHOLESALE):
     return timestamps_available["timestamps"][latest_block]
 
 
-def request_from_smard(filter_var, weekly_timestamp: Union[datetime.datetime, int]):
+def request_from_smard(filter_var, weekly_timestamp: Union[datetime.datetime, int], cache: PriceDiskCache = None,
+                       config: CONFIG.SimConfig = None):
+    # reformat week block to dictionary
+    timestamps, values = request_week_block(filter_var, weekly_timestamp, cache=cache, config=config)
+    return dict(zip(timestamps.tolist(), values.tolist()))
+
+
+# get a week block as (timestamps [s], values) arrays, from the persistent cache if available
+# cache, base url and timeout not given are taken from the configuration
+def request_week_block(filter_var, weekly_timestamp: Union[datetime.datetime, int], cache: PriceDiskCache = None,
+                       base_url: str = None, request_timeout: float = None, config: CONFIG.SimConfig = None):
+    config = config if config is not None else CONFIG.DEFAULT_CONFIG
     # check first if weekly_timestamp has the correct format, if not, modify it
     if type(weekly_timestamp) is int and not weekly_timestamp % 3600000:
         pass
     elif type(weekly_timestamp) is datetime.datetime:
         # determine the timestamp for the week's time
-        weekly_timestamp = smard_timestamp(weekly_timestamp)
+        weekly_timestamp = smard_timestamp(weekly_timestamp.timestamp())
     else:
         raise ValueError("Timestamp format is not supported. Use allowed epoch times (msec) or datetime object.")
 
+    # check persistent cache before any network request
+    cache = default_cache(config) if cache is None else cache
+    block = cache.load(filter_var, region, resolution, weekly_timestamp)
+    if block is not None:
+        return block
+    if cache.offline:
+        raise FileNotFoundError(f"week block {filter_var}_{region}_{resolution}_{weekly_timestamp} "
+                                f"is not cached and offline mode is set")
+
+    timestamps, values = download_week_block(filter_var, weekly_timestamp,
+                                             base_url=config.smard_url if base_url is None else base_url,
+                                             request_timeout=config.smard_timeout if request_timeout is None
+                                             else request_timeout)
+    # only weeks that are over are stored, values of the current week still change
+    if cache.is_week_closed(weekly_timestamp):
+        cache.store(filter_var, region, resolution, weekly_timestamp, timestamps, values)
+    return timestamps, values
+
+
+def download_week_block(filter_var, weekly_timestamp: int, base_url: str, request_timeout: float):
+    # imported on first use, importing this module must not cost startup time or network access
+    import requests
+
     # agent agent
+    # a timeout raises requests.Timeout and fails the fetch like any other request error
     data = requests.get(
-        f"https://www.smard.de/app/chart_data/{filter_var}/{region}/{filter_var}_"
-        f"{region}_{resolution}_{weekly_timestamp}.json"
-    ).json()
+        f"{base_url}/{filter_var}/{region}/{filter_var}_"
+        f"{region}_{resolution}_{weekly_timestamp}.json", timeout=request_timeout
+    )
+    data.raise_for_status()
+    data = data.json()
 
-    # reformat agent to dictionary
+    # reformat agent to arrays
     # input format: dictionary with key "series": [[timestamp0, value0], [timestamp1, value1], ...]
-    data_dict = {}
+    series = []
     for timestamps, values in data["series"]:
         # Since agent are provided for the whole week, some timeslots have no values yet. Discard these.
         if values is None:
             break
-        # perform conversion to epoch time and store values
-        current_timestamp = int(timestamps / 1000)
-        data_dict[current_timestamp] = values
+        series.append((timestamps, values))
 
-    return data_dict
+    # perform conversion to epoch time
+    series = np.array(series, dtype=np.float64).reshape(-1, 2)
+    return (series[:, 0] / 1000).astype(np.int64), series[:, 1]
 
 
-def get_wholesale_prices(weekly_timestamp=get_latest_date(filter_var=WHOLESALE), filter_var=WHOLESALE):
+def get_wholesale_prices(weekly_timestamp=None, filter_var=WHOLESALE, cache: PriceDiskCache = None,
+                         config: CONFIG.SimConfig = None):
     # return most recent prices, unless past timeslot is specified
-    return request_from_smard(filter_var, weekly_timestamp)
+    # (latest date is looked up at call time, never as a default argument at import time)
+    if weekly_timestamp is None:
+        weekly_timestamp = get_latest_date(filter_var=filter_var, config=config)
+    return request_from_smard(filter_var, weekly_timestamp, cache=cache, config=config)
 
 
-def get_source_composition(filter_source=RENEWABLE_GEN, filter_overall=OVERALL_GEN,
-                           weekly_timestamp=get_latest_date(filter_var=OVERALL_GEN)):
+def get_source_composition(filter_source=RENEWABLE_GEN, filter_overall=OVERALL_GEN, weekly_timestamp=None,
+                           config: CONFIG.SimConfig = None):
+    if weekly_timestamp is None:
+        weekly_timestamp = get_latest_date(filter_var=filter_overall, config=config)
     # first get overall generation
-    overall_generation = request_from_smard(filter_overall, weekly_timestamp)
+    overall_generation = request_from_smard(filter_overall, weekly_timestamp, config=config)
     # then get filtered generation
-    filtered_generation = request_from_smard(filter_source, weekly_timestamp)
+    filtered_generation = request_from_smard(filter_source, weekly_timestamp, config=config)
     # calculate fraction
     filtered_fraction = {}
     for ts in overall_generation.keys():
@@ -97,6 +159,40 @@ def smard_timestamp(epochtime):
     weekly_timestamp = int(berlin.localize(datetime.datetime.fromisocalendar(year, week_no, 1)).timestamp() * 1000)
     return weekly_timestamp
 
+
+# precomputed calendar of week blocks for a horizon, the boundaries (Mondays 00:00:00 'Europe/Berlin') are computed
+# once per week with smard_timestamp, so DST transitions are covered, and timestamps are mapped to week blocks by
+# a sorted array lookup instead of timezone conversions per timestamp
+class WeekCalendar:
+    def __init__(self, time_start: int, time_end: int):
+        # week boundaries [s], the last boundary is the end of the last week of the horizon
+        self.boundaries = np.zeros(0, dtype=np.int64)
+        self.extend(time_start=time_start, time_end=time_end)
+
+    # extend calendar to cover timestamps from time_start to time_end
+    def extend(self, time_start: int, time_end: int):
+        if len(self.boundaries):
+            if self.boundaries[0] <= time_start and time_end < self.boundaries[-1]:
+                return
+            time_start = min(time_start, int(self.boundaries[0]))
+            time_end = max(time_end, int(self.boundaries[-1]))
+        boundaries = [smard_timestamp(time_start) // 1000]
+        while boundaries[-1] <= time_end:
+            # half a day into the next week is inside it, whatever the DST offset
+            boundaries.append(smard_timestamp(boundaries[-1] + (7 * 24 + 12) * 3600) // 1000)
+        self.boundaries = np.array(boundaries, dtype=np.int64)
+
+    # week block timestamps (ms) of an array of timestamps [s]
+    def week_stamps(self, timestamps) -> np.ndarray:
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps):
+            self.extend(time_start=int(timestamps.min()), time_end=int(timestamps.max()))
+        return self.boundaries[np.searchsorted(self.boundaries, timestamps, side='right') - 1] * 1000
+
+    # week block timestamp (ms) of a single timestamp [s]
+    def week_stamp(self, timestamp: int) -> int:
+        return int(self.week_stamps([timestamp])[0])
+
 # print(get_source_composition(weekly_timestamp=datetime.datetime.strptime('20220203190000000000',CONFIG.TIME_KEY_FORMAT)))
 
 # print(get_source_composition(CONVENTIONAL_SOURCES))